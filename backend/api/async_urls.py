@@ -0,0 +1,13 @@
+from django.urls import path
+
+from .async_views import ingredients, recipes, subscriptions, tags
+
+urlpatterns = [
+    path("tags/", tags),
+    path("tags/<int:pk>/", tags),
+    path("ingredients/", ingredients),
+    path("ingredients/<int:pk>/", ingredients),
+    path("recipes/", recipes),
+    path("recipes/<int:pk>/", recipes),
+    path("users/subscriptions/", subscriptions),
+]
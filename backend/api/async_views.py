@@ -0,0 +1,183 @@
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from django.http import HttpResponse
+from django.urls import resolve
+from django.utils.cache import get_conditional_response
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.renderers import JSONRenderer
+
+from foodgram.models import Ingredient, Tag
+
+from .ingredient_index import ingredient_index
+from .mixins import set_conditional_headers
+from .serializers import IngredientSerializer, TagsSerializer
+from .versions import ingredients_version, tags_version
+from .views import CustomUserViewSet, IngredientsViewSet, RecipeViewSet
+
+SYNC_URLCONF = "foodgram_project.urls"
+
+
+class Fallback(Exception):
+    """Request is served by sync DRF view."""
+
+
+def render(data, status=200):
+    """Rendering data as DRF JSONRenderer does."""
+    return HttpResponse(JSONRenderer().render(data), status=status,
+                        content_type="application/json")
+
+
+def async_read(handler):
+    """
+    Serving GET requests by async handler.
+    Other methods and requests handler does not support
+    go to DRF view of sync urlconf in thread.
+    """
+
+    async def fallback(request, *args, **kwargs):
+        match = resolve(request.path_info, urlconf=SYNC_URLCONF)
+        return await sync_to_async(match.func)(
+            request, *match.args, **match.kwargs)
+
+    async def view(request, *args, **kwargs):
+        if request.method != "GET" or "format" in request.GET:
+            return await fallback(request, *args, **kwargs)
+        try:
+            return await handler(request, *args, **kwargs)
+        except Fallback:
+            return await fallback(request, *args, **kwargs)
+        except APIException as exc:
+            detail = exc.detail
+            if not isinstance(detail, (list, dict)):
+                detail = {"detail": detail}
+            response = render(detail, exc.status_code)
+            if exc.status_code == 401:
+                response["WWW-Authenticate"] = "Token"
+            return response
+
+    view.csrf_exempt = True
+    return view
+
+
+async def get_view(viewset, action, request, **kwargs):
+    """Getting DRF view with authenticated and permitted request."""
+    initkwargs = getattr(getattr(viewset, action), "kwargs", {})
+    view = viewset(action_map={"get": action}, args=(), kwargs=kwargs,
+                   format_kwarg=None, headers={}, **initkwargs)
+    view.request = view.initialize_request(request, **kwargs)
+    await sync_to_async(view.perform_authentication)(view.request)
+    view.check_permissions(view.request)
+    return view
+
+
+async def paginate(view, queryset):
+    """Getting page of queryset by view paginator with async queries."""
+    pagination = view.paginator
+    request = view.request
+    paginator = pagination.django_paginator_class(
+        queryset, pagination.get_page_size(request))
+    paginator.count = await queryset.acount()
+    try:
+        page = paginator.page(
+            pagination.get_page_number(request, paginator))
+    except InvalidPage as exc:
+        raise NotFound(pagination.invalid_page_message.format(
+            page_number=request.query_params.get(
+                pagination.page_query_param, 1), message=str(exc)))
+    page.object_list = [item async for item in page.object_list]
+    pagination.request = request
+    pagination.page = page
+    pagination.use_cursor = False
+    return page.object_list
+
+
+def paginated(view, data):
+    pagination = view.paginator
+    return render({
+        "count": pagination.page.paginator.count,
+        "next": pagination.get_next_link(),
+        "previous": pagination.get_previous_link(),
+        "results": data,
+    })
+
+
+async def get_instance(queryset, pk):
+    try:
+        return await queryset.aget(pk=pk)
+    except queryset.model.DoesNotExist:
+        raise NotFound("No %s matches the given query."
+                       % queryset.model._meta.object_name)
+
+
+async def conditional(request, data_version, get_response):
+    """Answering with 304 or response with validators headers."""
+    etag, last_modified = await sync_to_async(
+        data_version.get_validators)()
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = await get_response()
+    return set_conditional_headers(response, etag, last_modified)
+
+
+@async_read
+async def tags(request, pk=None):
+    """Tags list and detail."""
+
+    async def get_response():
+        if pk is not None:
+            tag = await get_instance(Tag.objects.all(), pk)
+            return render(TagsSerializer(tag).data)
+        return render(TagsSerializer(
+            [tag async for tag in Tag.objects.all()], many=True).data)
+
+    return await conditional(request, tags_version, get_response)
+
+
+@async_read
+async def ingredients(request, pk=None):
+    """Ingredients list with name search and detail."""
+
+    async def get_response():
+        if pk is not None:
+            ingredient = await get_instance(Ingredient.objects.all(), pk)
+            return render(IngredientSerializer(ingredient).data)
+        view = await get_view(IngredientsViewSet, "list", request)
+        name = view.request.query_params.get("name")
+        if name is None:
+            return HttpResponse(
+                await sync_to_async(lambda: ingredient_index.rendered)(),
+                content_type="application/json")
+        return render(await sync_to_async(ingredient_index.search)(
+            name, view.get_limit()))
+
+    return await conditional(request, ingredients_version, get_response)
+
+
+@async_read
+async def recipes(request, pk=None):
+    """Recipes list and detail, cursor pages go to sync view."""
+    if "cursor" in request.GET:
+        raise Fallback
+    action = "list" if pk is None else "retrieve"
+    view = await get_view(RecipeViewSet, action, request)
+    queryset = await sync_to_async(view.get_queryset)()
+    if pk is not None:
+        return render(view.get_serializer(
+            await get_instance(queryset, pk)).data)
+    page = await paginate(view, queryset)
+    return paginated(view, view.get_serializer(page, many=True).data)
+
+
+@async_read
+async def subscriptions(request):
+    """Authors followed by request user with their recipes."""
+    view = await get_view(CustomUserViewSet, "subscriptions", request)
+    authors = await paginate(view, view.get_subscriptions())
+    serializer = view.get_serializer(authors, many=True)
+    author_recipes = {}
+    async for recipe in view.get_author_recipes(
+            authors, serializer.child.get_recipes_limit()):
+        author_recipes.setdefault(recipe.author_id, []).append(recipe)
+    serializer.context["author_recipes"] = author_recipes
+    return paginated(view, serializer.data)
@@ -0,0 +1,101 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+# Written by queryset update() without signals, so they are not cached.
+VOLATILE_USER_FIELDS = ("avatar_variants", "recipes_count", "followers_count")
+
+
+class TokenCache:
+    """
+    Token to (user, token) resolution cache.
+    Per-process LRU with short TTL by default, so other processes
+    see logout after TOKEN_CACHE_TTL seconds. Shared cache backend
+    when TOKEN_CACHE_BACKEND is set, so invalidation reaches
+    all processes at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @property
+    def shared(self):
+        if settings.TOKEN_CACHE_BACKEND is None:
+            return None
+        return caches[settings.TOKEN_CACHE_BACKEND]
+
+    def get_cache_key(self, key):
+        return f"foodgram:token:{key}"
+
+    def get(self, key):
+        if self.shared is not None:
+            return self.shared.get(self.get_cache_key(key))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.shared is not None:
+            self.shared.set(self.get_cache_key(key), value,
+                            settings.TOKEN_CACHE_TTL)
+            return
+        with self._lock:
+            self._entries[key] = (
+                time.monotonic() + settings.TOKEN_CACHE_TTL, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Dropping token entry after logout or user changes."""
+        if self.shared is not None:
+            self.shared.delete(self.get_cache_key(key))
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication without database query
+    for recently resolved tokens.
+    Volatile user fields are deferred, so they are read
+    from database on access and not written by save().
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            cached = self.get_credentials(key)
+            token_cache.set(key, cached)
+        user, token = cached
+        return copy.copy(user), token
+
+    def get_credentials(self, key):
+        try:
+            token = self.get_model().objects.select_related("user").defer(
+                *(f"user__{field}" for field in VOLATILE_USER_FIELDS)).get(
+                    key=key)
+        except self.get_model().DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _("User inactive or deleted."))
+        return token.user, token
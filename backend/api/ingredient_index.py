@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+from foodgram.models import Ingredient
+
+from .versions import ingredients_version
+
+TRIGRAM_SIZE = 3
+
+
+def get_trigrams(value):
+    """Getting set of value trigrams."""
+    return {value[i:i + TRIGRAM_SIZE]
+            for i in range(len(value) - TRIGRAM_SIZE + 1)}
+
+
+class IngredientIndex:
+    """
+    Per-process ingredient autocomplete index.
+    Prefix matches are found by bisect over sorted names,
+    substring matches by trigram posting lists.
+    Index is rebuilt when ingredients version changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = None
+
+    def invalidate(self):
+        """Dropping index, it is rebuilt on next access."""
+        self._state = None
+
+    def build(self):
+        """Building index from Ingredient table."""
+        version = ingredients_version.get()
+        items = sorted(
+            Ingredient.objects.values("id", "name", "measurement_unit"),
+            key=lambda item: (item["name"].lower(), item["id"]))
+        names = [item["name"].lower() for item in items]
+        trigrams = {}
+        for position, name in enumerate(names):
+            for trigram in get_trigrams(name):
+                trigrams.setdefault(trigram, []).append(position)
+        rendered = json.dumps(
+            items, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return {
+            "built_at": time.monotonic(),
+            "version": version,
+            "items": items,
+            "names": names,
+            "trigrams": trigrams,
+            "rendered": rendered,
+        }
+
+    def is_stale(self, state):
+        return (state is None
+                or state["version"] != ingredients_version.get()
+                or time.monotonic() - state["built_at"]
+                > settings.INGREDIENT_INDEX_TTL)
+
+    def get_state(self):
+        """Getting actual index, rebuilding it when it is stale."""
+        state = self._state
+        if self.is_stale(state):
+            with self._lock:
+                state = self._state
+                if self.is_stale(state):
+                    state = self._state = self.build()
+        return state
+
+    @property
+    def rendered(self):
+        """All ingredients as compact json."""
+        return self.get_state()["rendered"]
+
+    def get_substring_candidates(self, state, name):
+        """Getting sorted positions which may contain name."""
+        if len(name) < TRIGRAM_SIZE:
+            return range(len(state["names"]))
+        postings = sorted(
+            (state["trigrams"].get(trigram, ())
+             for trigram in get_trigrams(name)), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+        return sorted(candidates)
+
+    def search(self, name, limit):
+        """
+        Searching ingredients by name.
+        Prefix matches go first, substring matches after.
+        """
+        state = self.get_state()
+        names, items = state["names"], state["items"]
+        name = name.lower()
+        result = []
+        position = bisect_left(names, name)
+        while (position < len(names) and len(result) < limit
+               and names[position].startswith(name)):
+            result.append(items[position])
+            position += 1
+        for position in self.get_substring_candidates(state, name):
+            if len(result) >= limit:
+                break
+            current = names[position]
+            if name in current and not current.startswith(name):
+                result.append(items[position])
+        return result
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,83 @@
+import string
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from foodgram.models import Recipe
+
+ALPHABET = string.digits + string.ascii_letters
+BASE = len(ALPHABET)
+INDEXES = {char: index for index, char in enumerate(ALPHABET)}
+# Largest id of bigint primary key.
+MAX_ID = 2 ** 63 - 1
+
+
+def encode_id(number):
+    """Encoding positive id into base62 code."""
+    code = ""
+    while True:
+        number, remainder = divmod(number, BASE)
+        code = ALPHABET[remainder] + code
+        if not number:
+            return code
+
+
+MAX_CODE_LENGTH = len(encode_id(MAX_ID))
+
+
+def decode_code(code):
+    """Decoding base62 code into id, ValueError for invalid code."""
+    if (not code or len(code) > MAX_CODE_LENGTH
+            or code[0] == ALPHABET[0] and len(code) > 1):
+        raise ValueError(f"Invalid code {code}.")
+    number = 0
+    for char in code:
+        if char not in INDEXES:
+            raise ValueError(f"Invalid code {code}.")
+        number = number * BASE + INDEXES[char]
+    if number > MAX_ID:
+        raise ValueError(f"Invalid code {code}.")
+    return number
+
+
+def parse_id(value):
+    """Parsing decimal id, ValueError for invalid or too big one."""
+    if not value.isdecimal() or len(value) > len(str(MAX_ID)):
+        raise ValueError(f"Invalid id {value}.")
+    number = int(value)
+    if number > MAX_ID:
+        raise ValueError(f"Invalid id {value}.")
+    return number
+
+
+class RecipeLinks:
+    """
+    Per-process LRU of existing recipe ids for short links.
+    Only found ids are cached, so new recipes resolve at once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = OrderedDict()
+
+    def exists(self, pk):
+        with self._lock:
+            if pk in self._ids:
+                self._ids.move_to_end(pk)
+                return True
+        if not Recipe.objects.filter(pk=pk).exists():
+            return False
+        with self._lock:
+            self._ids[pk] = True
+            self._ids.move_to_end(pk)
+            while len(self._ids) > settings.SHORT_LINK_CACHE_SIZE:
+                self._ids.popitem(last=False)
+        return True
+
+    def discard(self, pk):
+        with self._lock:
+            self._ids.pop(pk, None)
+
+
+recipe_links = RecipeLinks()
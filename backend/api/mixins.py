@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def set_conditional_headers(response, etag, last_modified):
+    """Setting validators and public caching headers of response."""
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(
+        response, public=True, max_age=settings.REFERENCE_DATA_MAX_AGE)
+    return response
+
+
+class ConditionalReadMixin:
+    """
+    Mixin for read only reference data ViewSets.
+    Adds ETag, Last-Modified and Cache-Control headers from data_version
+    and answers conditional requests with 304 without reading data.
+    """
+
+    data_version = None
+    authentication_classes = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        etag, last_modified = self.data_version.get_validators()
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        return set_conditional_headers(response, etag, last_modified)
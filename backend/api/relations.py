@@ -0,0 +1,39 @@
+from django.contrib.auth import models
+from django.utils.functional import cached_property
+
+
+class RelationsCache:
+    """
+    Request scoped cache of users relations.
+    Each relation is loaded by one query on first access
+    and then checked as a set.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def followed_ids(self):
+        return set(self.user.follows.values_list("item_id", flat=True))
+
+    @cached_property
+    def favorite_ids(self):
+        return set(
+            self.user.favoriterecipes.values_list("item_id", flat=True))
+
+    @cached_property
+    def incart_ids(self):
+        return set(self.user.incartrecipes.values_list("item_id", flat=True))
+
+
+def get_relations(request):
+    """
+    Getting relations cache attached to request.
+    Returns None for anonymous user.
+    """
+    if request is None or request.user.__class__ is models.AnonymousUser:
+        return None
+    http_request = getattr(request, "_request", request)
+    if not hasattr(http_request, "relations_cache"):
+        http_request.relations_cache = RelationsCache(request.user)
+    return http_request.relations_cache
@@ -0,0 +1,120 @@
+import abc
+import csv
+import io
+import os
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework import renderers
+
+SHOPPING_LIST_TITLE = "Список покупок"
+PDF_FONT_NAME = "ShoppingListFont"
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 50
+PDF_CHUNK_SIZE = 8192
+
+
+class ShoppingListRenderer(abc.ABC, renderers.BaseRenderer):
+    """
+    Base renderer for shopping list downloads.
+    Shopping list is streamed by stream method,
+    error responses are rendered by JSONRenderer.
+    """
+
+    charset = "utf-8"
+    file_name = "shopping_list"
+
+    def get_content_type(self):
+        if self.charset is None:
+            return self.media_type
+        return f"{self.media_type}; charset={self.charset}"
+
+    def get_file_name(self):
+        return f"{self.file_name}.{self.format}"
+
+    @abc.abstractmethod
+    def stream(self, ingredients):
+        """Yielding shopping list chunks."""
+
+
+class TxtShoppingListRenderer(ShoppingListRenderer):
+    """Shopping list as plain text."""
+
+    media_type = "text/plain"
+    format = "txt"
+
+    def stream(self, ingredients):
+        yield f"{SHOPPING_LIST_TITLE} \n"
+        for item in ingredients:
+            yield (f"{item['name']} ({item['measurement_unit']}) "
+                   f"— {item['amount']} \n")
+
+
+class Echo:
+    """Pseudo buffer returning written value for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+class CsvShoppingListRenderer(ShoppingListRenderer):
+    """Shopping list as csv table."""
+
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(("name", "measurement_unit", "amount"))
+        for item in ingredients:
+            yield writer.writerow(
+                (item["name"], item["measurement_unit"], item["amount"]))
+
+
+class PdfShoppingListRenderer(ShoppingListRenderer):
+    """
+    Shopping list as pdf document.
+    Unlike txt and csv it is not flat in memory: reportlab writes
+    cross-reference table and embedded font subset on save,
+    so whole document is built before first chunk is sent.
+    Its size is bounded by number of distinct ingredients.
+    """
+
+    media_type = "application/pdf"
+    format = "pdf"
+    charset = None
+
+    def get_font(self):
+        """Registering font with cyrillic glyphs if it is available."""
+        if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+            return PDF_FONT_NAME
+        if not os.path.exists(settings.SHOPPING_LIST_FONT):
+            return "Helvetica"
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_FONT))
+        return PDF_FONT_NAME
+
+    def stream(self, ingredients):
+        buffer = io.BytesIO()
+        font = self.get_font()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        line_height = PDF_FONT_SIZE * 1.5
+        text = pdf.beginText(PDF_MARGIN, height - PDF_MARGIN)
+        text.setFont(font, PDF_FONT_SIZE, leading=line_height)
+        text.textLine(SHOPPING_LIST_TITLE)
+        for item in ingredients:
+            if text.getY() - line_height < PDF_MARGIN:
+                pdf.drawText(text)
+                pdf.showPage()
+                text = pdf.beginText(PDF_MARGIN, height - PDF_MARGIN)
+                text.setFont(font, PDF_FONT_SIZE, leading=line_height)
+            text.textLine(f"{item['name']} ({item['measurement_unit']}) "
+                          f"— {item['amount']}")
+        pdf.drawText(text)
+        pdf.save()
+        buffer.seek(0)
+        yield from iter(lambda: buffer.read(PDF_CHUNK_SIZE), b"")
@@ -1,18 +1,26 @@
 import base64
 import re
+from functools import reduce
+from operator import or_
 
-from django.contrib.auth import get_user_model, models
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Prefetch, Q, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 from rest_framework.validators import UniqueValidator
 
 # линтер ругается на отсутствие строки
+from foodgram.images import get_variant_url
 from foodgram.models import (FavoriteRecipe, IncartRecipe, Ingredient,
                              IngredientAmount, Recipe, RecipeIngredient,
                              RecipeTag, Subscription, Tag)
 
+from .relations import get_relations
 from .variables import (MAX_AMOUNT_VALUE, MAX_COOKING_TIME_VALUE,
                         MIN_AMOUNT_VALUE, MIN_COOKING_TIME_VALUE)
 
@@ -23,8 +31,23 @@ class Base64ImageField(serializers.ImageField):
     """
     Сlass for users avatar
     and recipe image fields.
+    Represents ready processed variant of image if it is given.
     """
 
+    def __init__(self, *args, variant=None, **kwargs):
+        self.variant = variant
+        super().__init__(*args, **kwargs)
+
+    def to_representation(self, value):
+        variant = self.context.get(f"{self.field_name}_variant", self.variant)
+        url = get_variant_url(value, variant) if value else None
+        if url is None:
+            return super().to_representation(value)
+        request = self.context.get("request", None)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith("data:image"):
             format, imgstr = data.split(";base64,")
@@ -35,10 +58,47 @@ class Base64ImageField(serializers.ImageField):
         return super().to_internal_value(data)
 
 
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Many related field fetching all objects by one query."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pk_field = queryset.model._meta.pk
+        pks = []
+        for value in data:
+            try:
+                pks.append(pk_field.to_python(value))
+            except (TypeError, ValidationError):
+                child.fail("incorrect_type", data_type=type(value).__name__)
+        objects = queryset.in_bulk(pks)
+        for pk in pks:
+            if pk not in objects:
+                child.fail("does_not_exist", pk_value=pk)
+        return [objects[pk] for pk in pks]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field with bulk lookup when many=True."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
 class CustomUserSerializer(UserSerializer):
     """Class for users profiles."""
 
     is_subscribed = serializers.SerializerMethodField()
+    avatar = Base64ImageField(variant="thumbnail", read_only=True)
 
     class Meta(UserSerializer.Meta):
 
@@ -49,20 +109,17 @@ class CustomUserSerializer(UserSerializer):
             "email", "id", "username", "first_name",
             "last_name", "avatar", "is_subscribed")
 
-    def get_user(self):
-        """Part of getting is_subscribed field."""
-        request = self.context.get('request', None)
-        user = request.user
-        if request is not None and user.__class__ is not models.AnonymousUser:
-            return user
-        return None
-
     def get_is_subscribed(self, obj):
-        """Getting is_subscribed field."""
-        user = self.get_user()
-        if user is not None:
-            return obj.first_name in user.follows.all().values_list(
-                'item__first_name', flat=True)
+        """
+        Getting is_subscribed field.
+        Reads queryset annotation when it is present,
+        request relations cache otherwise.
+        """
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
+        relations = get_relations(self.context.get("request", None))
+        if relations is not None:
+            return obj.id in relations.followed_ids
         return False
 
 
@@ -142,6 +199,8 @@ class FollowCreateSerializer(serializers.ModelSerializer):
 class ShortRecipeSerializer(serializers.ModelSerializer):
     """Serializer for users/subscriptions short recipe."""
 
+    image = Base64ImageField(variant="thumbnail", read_only=True)
+
     class Meta:
         fields = ("id", "name", "image", "cooking_time")
         model = Recipe
@@ -149,27 +208,33 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
 
 
 class FollowUserSerializer(CustomUserSerializer):
-    """Class for getting users subscriptions."""
+    """
+    Class for getting users subscriptions.
+    Uses author_recipes context prepared
+    by CustomUserViewSet.subscriptions when it is present.
+    """
 
-    def to_representation(self, instance):
+    def get_recipes_limit(self):
         request = self.context.get("request", None)
-        query_dict = request.query_params.copy()
-        recipes_limit = query_dict.get("recipes_limit")
-        representation = super().to_representation(instance)
-        recipes_queryset = Recipe.objects.filter(author=instance.id)
+        recipes_limit = request.query_params.get("recipes_limit")
         if recipes_limit is not None:
-            recipes_queryset = recipes_queryset[:int(recipes_limit)]
-        serializer = ShortRecipeSerializer(recipes_queryset, many=True)
-        representation["recipes"] = serializer.data
-        representation["recipes_count"] = recipes_queryset.count()
-        return representation
-
-
-class ManyFollowUserSerializer(FollowUserSerializer):
-    """Class for getting users subscriptions."""
+            return int(recipes_limit)
+        return None
 
     def to_representation(self, instance):
-        representation = super().to_representation(instance.item)
+        representation = super().to_representation(instance)
+        author_recipes = self.context.get("author_recipes")
+        if author_recipes is not None:
+            recipes = author_recipes.get(instance.id, [])
+        else:
+            recipes = Recipe.objects.filter(author=instance.id)
+            recipes_limit = self.get_recipes_limit()
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
+        serializer = ShortRecipeSerializer(
+            recipes, many=True, context=self.context)
+        representation["recipes"] = serializer.data
+        representation["recipes_count"] = instance.recipes_count
         return representation
 
 
@@ -216,10 +281,7 @@ class IngredientSerializer(serializers.ModelSerializer):
 class IngredientAmountCreateSerializer(serializers.ModelSerializer):
     """Serializer for ingredient and its amount."""
 
-    id = serializers.PrimaryKeyRelatedField(
-        source="ingredient",
-        queryset=Ingredient.objects.all(),
-    )
+    id = serializers.IntegerField(source="ingredient")
     amount = serializers.IntegerField(
         min_value=MIN_AMOUNT_VALUE,
         max_value=MAX_AMOUNT_VALUE,
@@ -228,6 +290,7 @@ class IngredientAmountCreateSerializer(serializers.ModelSerializer):
     class Meta:
         fields = ("id", "amount",)
         model = IngredientAmount
+        validators = []
 
 
 class IngredientAmountSerializer(serializers.ModelSerializer):
@@ -245,16 +308,6 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
         return representation
 
 
-class ShoppingCartSerializer(serializers.ModelSerializer):
-    """Serializer for downloading incart recipes."""
-
-    ingredient = IngredientSerializer()
-
-    class Meta:
-        fields = ("id", "ingredient", "amount")
-        model = IngredientAmount
-
-
 class FavoriteRecipeSerializer(serializers.ModelSerializer):
     """Serializer for users favorite recipes."""
 
@@ -289,6 +342,7 @@ class RecipeReperesentationSerializer(serializers.ModelSerializer):
     ingredients = IngredientAmountSerializer(many=True)
     tags = TagsSerializer(many=True)
     author = CustomUserSerializer()
+    image = Base64ImageField(variant="full", read_only=True)
 
     class Meta:
         fields = ("id", "ingredients", "tags", "image",
@@ -300,27 +354,30 @@ class RecipeReperesentationSerializer(serializers.ModelSerializer):
                             "cooking_time", "author",
                             "is_favorited", "is_in_shopping_cart")
 
-    def get_user(self):
-        request = self.context.get("request", None)
-        user = request.user
-        if request is not None and user.__class__ is not models.AnonymousUser:
-            return user
-        return None
-
     def get_is_favorited(self, obj):
-        """Getting is_favorited field."""
-        user = self.get_user()
-        if user is not None:
-            return obj.name in user.favoriterecipes.all().values_list(
-                "item__name", flat=True)
+        """
+        Getting is_favorited field.
+        Reads RecipeViewSet queryset annotation when it is present,
+        request relations cache otherwise.
+        """
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
+        relations = get_relations(self.context.get("request", None))
+        if relations is not None:
+            return obj.id in relations.favorite_ids
         return False
 
     def get_is_in_shopping_cart(self, obj):
-        """Getting is_in_shopping_cart field."""
-        user = self.get_user()
-        if user is not None:
-            return obj.name in user.incartrecipes.all().values_list(
-                "item__name", flat=True)
+        """
+        Getting is_in_shopping_cart field.
+        Reads RecipeViewSet queryset annotation when it is present,
+        request relations cache otherwise.
+        """
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
+        relations = get_relations(self.context.get("request", None))
+        if relations is not None:
+            return obj.id in relations.incart_ids
         return False
 
 
@@ -333,7 +390,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     ingredients = IngredientAmountCreateSerializer(
         many=True,
         required=True)
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         required=True,
         many=True)
@@ -354,75 +411,140 @@ class RecipeSerializer(serializers.ModelSerializer):
         """
         Getting ingredient and amount list
         for making relations in RecipeIngredient table.
+        Existing pairs are selected by one query,
+        missing ones are inserted by one bulk_create.
         """
 
-        ingredient_amount_list = []
-        for current_ingredient in ingredients:
-            ingredient = current_ingredient["ingredient"]
-            amount = current_ingredient["amount"]
-            ingredient_amount, status = IngredientAmount.objects.get_or_create(
-                ingredient=ingredient, amount=amount)
-            ingredient_amount_list.append(ingredient_amount)
-        return ingredient_amount_list
+        pairs = [(item["ingredient"].id, item["amount"])
+                 for item in ingredients]
+        lookup = reduce(or_, (Q(ingredient_id=ingredient_id, amount=amount)
+                              for ingredient_id, amount in pairs))
+        existing = {
+            (item.ingredient_id, item.amount): item
+            for item in IngredientAmount.objects.filter(lookup)}
+        missing = [pair for pair in pairs if pair not in existing]
+        if missing:
+            IngredientAmount.objects.bulk_create(
+                (IngredientAmount(ingredient_id=ingredient_id, amount=amount)
+                 for ingredient_id, amount in missing),
+                ignore_conflicts=True)
+            lookup = reduce(or_, (
+                Q(ingredient_id=ingredient_id, amount=amount)
+                for ingredient_id, amount in missing))
+            existing.update(
+                ((item.ingredient_id, item.amount), item)
+                for item in IngredientAmount.objects.filter(lookup))
+        return [existing[pair] for pair in pairs]
 
     def create(self, validated_data):
         """Method creating Recipes object."""
         ingredients = validated_data.pop("ingredients")
         tags = validated_data.pop("tags")
-        recipe = Recipe.objects.create(**validated_data)
-        RecipeTag.objects.bulk_create(
-            RecipeTag(tag=tag, recipe=recipe)
-            for tag in tags)
-        ingredient_amount_list = self.get_ingredient_amount_list(ingredients)
-        RecipeIngredient.objects.bulk_create(
-            RecipeIngredient(recipe=recipe, ingredient=ingredient_amount)
-            for ingredient_amount in ingredient_amount_list)
-        return recipe
-
-    def update(self, instance, validated_data):
-        """Method updateting Recipes object data."""
-        ingredients = validated_data.get("ingredients", [])
-        tags = validated_data.get("tags", [])
-        instance.name = validated_data.get("name", instance.name)
-        instance.text = validated_data.get("text", instance.text)
-        instance.image = validated_data.get("image", instance.image)
-        instance.cooking_time = validated_data.get("cooking_time",
-                                                   instance.cooking_time)
-        instance.save()
-        if tags:
-            instance.tags.clear()
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
             RecipeTag.objects.bulk_create(
-                RecipeTag(tag=tag, recipe=instance)
+                RecipeTag(tag=tag, recipe=recipe)
                 for tag in tags)
-        else:
-            self.validate_tags(tags)
-        if ingredients:
-            instance.ingredients.clear()
             ingredient_amount_list = self.get_ingredient_amount_list(
                 ingredients)
             RecipeIngredient.objects.bulk_create(
-                RecipeIngredient(recipe=instance, ingredient=ingredient_amount)
+                RecipeIngredient(recipe=recipe, ingredient=ingredient_amount)
                 for ingredient_amount in ingredient_amount_list)
-        else:
-            self.validate_ingredients(ingredients)
+        return recipe
+
+    def update_tags(self, instance, tags):
+        """Deleting removed and inserting added RecipeTag rows."""
+        new_ids = {tag.id for tag in tags}
+        old_ids = set(RecipeTag.objects.filter(
+            recipe=instance).values_list("tag_id", flat=True))
+        if old_ids - new_ids:
+            RecipeTag.objects.filter(
+                recipe=instance, tag_id__in=old_ids - new_ids).delete()
+        if new_ids - old_ids:
+            RecipeTag.objects.bulk_create(
+                RecipeTag(tag_id=tag_id, recipe=instance)
+                for tag_id in new_ids - old_ids)
+
+    def update_ingredients(self, instance, ingredients):
+        """Deleting removed and inserting added RecipeIngredient rows."""
+        old_pairs = {
+            (ingredient_id, amount): amount_id
+            for amount_id, ingredient_id, amount
+            in RecipeIngredient.objects.filter(recipe=instance).values_list(
+                "ingredient_id", "ingredient__ingredient_id",
+                "ingredient__amount")}
+        added = [item for item in ingredients
+                 if (item["ingredient"].id, item["amount"]) not in old_pairs]
+        new_pairs = {(item["ingredient"].id, item["amount"])
+                     for item in ingredients}
+        removed_ids = [amount_id for pair, amount_id in old_pairs.items()
+                       if pair not in new_pairs]
+        if removed_ids:
+            RecipeIngredient.objects.filter(
+                recipe=instance, ingredient_id__in=removed_ids).delete()
+        if added:
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=instance, ingredient=ingredient_amount)
+                for ingredient_amount
+                in self.get_ingredient_amount_list(added))
+
+    def update(self, instance, validated_data):
+        """
+        Method updateting Recipes object data.
+        Only changed columns and relations are written
+        in one transaction.
+        """
+        ingredients = validated_data.pop("ingredients", [])
+        tags = validated_data.pop("tags", [])
+        validated_data.pop("author", None)
+        self.validate_tags(tags)
+        if len(ingredients) == 0:
+            raise serializers.ValidationError()
+        changed_fields = [
+            field for field, value in validated_data.items()
+            if getattr(instance, field) != value]
+        with transaction.atomic():
+            for field in changed_fields:
+                setattr(instance, field, validated_data[field])
+            if changed_fields:
+                instance.save(update_fields=changed_fields)
+            self.update_tags(instance, tags)
+            self.update_ingredients(instance, ingredients)
         return instance
 
     def to_representation(self, instance):
         """Method representing Recipes object data."""
         request = self.context.get("request", None)
+        prefetch_related_objects(
+            [instance],
+            Prefetch("ingredients",
+                     queryset=IngredientAmount.objects.select_related(
+                         "ingredient")),
+            "tags")
+        view = self.context.get("view", None)
+        image_variant = "full"
+        if view is not None and view.action == "list":
+            image_variant = "card"
         representation = RecipeReperesentationSerializer(
-            instance, context={"request": request})
+            instance, context={"request": request,
+                               "image_variant": image_variant})
         return representation.data
 
     def validate_ingredients(self, value):
-        """Method validating ingredients field."""
+        """
+        Method validating ingredients field.
+        All ingredients are fetched by one query.
+        """
         if len(value) == 0:
             raise serializers.ValidationError()
-        ids_stack = set()
+        ids = [item["ingredient"] for item in value]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError()
+        ingredients = Ingredient.objects.in_bulk(ids)
+        if len(ingredients) != len(ids):
+            raise serializers.ValidationError()
         for item in value:
-            if item["ingredient"].id in ids_stack:
-                raise serializers.ValidationError()
-            ids_stack.add(item["ingredient"].id)
+            item["ingredient"] = ingredients[item["ingredient"]]
         return value
 
     def validate_tags(self, value):
@@ -0,0 +1,46 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from foodgram.models import Ingredient, Recipe, Tag
+
+from .authentication import token_cache
+from .ingredient_index import ingredient_index
+from .links import recipe_links
+from .versions import ingredients_version, tags_version
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_ingredients_version(sender, **kwargs):
+    """Bumping ingredients version after ingredients changes."""
+    ingredients_version.bump()
+    ingredient_index.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    """Bumping tags version after tags changes."""
+    tags_version.bump()
+
+
+@receiver(post_delete, sender=Recipe)
+def discard_recipe_link(sender, instance, **kwargs):
+    """Dropping deleted recipe from short links cache."""
+    recipe_links.discard(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    """Dropping cached token after logout or user deletion."""
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """Dropping cached tokens of changed user, e.g. after set_password."""
+    for key in Token.objects.filter(user=instance).values_list(
+            "key", flat=True):
+        token_cache.invalidate(key)
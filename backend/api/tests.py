@@ -0,0 +1,563 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from foodgram.models import (FavoriteRecipe, IncartRecipe, Ingredient,
+                             IngredientAmount, Recipe, RecipeIngredient,
+                             RecipeTag, ReferenceVersion, Subscription, Tag)
+
+from .authentication import CachedTokenAuthentication, token_cache
+from .links import MAX_ID, encode_id
+from .throttling import token_buckets
+
+User = get_user_model()
+
+RECIPES_COUNT = 12
+IMAGE = ("data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJ"
+         "AAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg==")
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class ApiTestCase(TestCase):
+    """Base case with recipes of one author and authorized client."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="user", email="user@example.com", password="pass",
+            first_name="Имя", last_name="Фамилия")
+        cls.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass",
+            first_name="Имя", last_name="Фамилия")
+        cls.tags = Tag.objects.bulk_create(
+            Tag(name=f"Тег {number}", slug=f"tag{number}")
+            for number in range(5))
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"Ингредиент {number}", measurement_unit="г")
+            for number in range(5))
+        cls.amounts = IngredientAmount.objects.bulk_create(
+            IngredientAmount(ingredient=ingredient, amount=10)
+            for ingredient in cls.ingredients)
+        cls.recipes = [
+            cls.create_recipe(cls.author, number)
+            for number in range(RECIPES_COUNT)]
+
+    @classmethod
+    def create_recipe(cls, author, number):
+        recipe = Recipe.objects.create(
+            author=author, name=f"Рецепт {number}", text="Текст",
+            cooking_time=10, image="recipes/images/image.png")
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag=tag) for tag in cls.tags[:2])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=amount)
+            for amount in cls.amounts[:3])
+        return recipe
+
+    def setUp(self):
+        token_buckets._states.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class RecipeFlagsQueriesTest(ApiTestCase):
+    """is_favorited and is_in_shopping_cart cost no queries per recipe."""
+
+    def get_page(self):
+        with self.assertNumQueries(5):
+            response = self.client.get("/api/recipes/")
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"]
+
+    def test_flags_queries_do_not_depend_on_favorites(self):
+        self.get_page()
+        FavoriteRecipe.objects.bulk_create(
+            FavoriteRecipe(user=self.user, item=recipe)
+            for recipe in self.recipes)
+        IncartRecipe.objects.bulk_create(
+            IncartRecipe(user=self.user, item=recipe)
+            for recipe in self.recipes[::2])
+        results = self.get_page()
+        self.assertTrue(all(item["is_favorited"] for item in results))
+        in_cart = {recipe.id for recipe in self.recipes[::2]}
+        for item in results:
+            self.assertEqual(
+                item["is_in_shopping_cart"], item["id"] in in_cart)
+
+    def test_flags_of_other_user_are_not_shown(self):
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="pass")
+        FavoriteRecipe.objects.create(user=other, item=self.recipes[0])
+        results = self.get_page()
+        self.assertFalse(any(item["is_favorited"] for item in results))
+
+
+class RecipeReadQueriesTest(ApiTestCase):
+    """Recipe pages cost fixed number of queries."""
+
+    def assertQueries(self, url, number, client=None):
+        with self.assertNumQueries(number):
+            response = (client or self.client).get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_list_queries_do_not_depend_on_page_size(self):
+        for limit in (1, RECIPES_COUNT):
+            data = self.assertQueries(f"/api/recipes/?limit={limit}", 5)
+            self.assertEqual(len(data["results"]), limit)
+
+    def test_anonymous_list(self):
+        data = self.assertQueries("/api/recipes/", 5, client=APIClient())
+        self.assertEqual(len(data["results"]), RECIPES_COUNT)
+
+    def test_detail(self):
+        data = self.assertQueries(f"/api/recipes/{self.recipes[0].id}/", 4)
+        self.assertEqual(len(data["ingredients"]), 3)
+        self.assertEqual(len(data["tags"]), 2)
+
+    def test_filtered_lists(self):
+        FavoriteRecipe.objects.create(user=self.user, item=self.recipes[0])
+        IncartRecipe.objects.create(user=self.user, item=self.recipes[1])
+        for url, queries, count in (
+                (f"/api/recipes/?tags={self.tags[0].slug}", 6, RECIPES_COUNT),
+                (f"/api/recipes/?author={self.author.id}", 5, RECIPES_COUNT),
+                ("/api/recipes/?is_favorited=1", 5, 1),
+                ("/api/recipes/?is_in_shopping_cart=1", 5, 1)):
+            with self.subTest(url=url):
+                data = self.assertQueries(url, queries)
+                self.assertEqual(data["count"], count)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeWriteQueriesTest(ApiTestCase):
+    """Recipe writes cost fixed number of queries."""
+
+    # SQLite keeps search index in FTS table written by signals.
+    SEARCH_QUERIES = 2 if connection.vendor == "sqlite" else 0
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+
+    def get_data(self, ingredients, tags, amount=7):
+        return {
+            "name": "Новый рецепт",
+            "text": "Текст",
+            "cooking_time": 5,
+            "image": IMAGE,
+            "tags": [tag.id for tag in tags],
+            "ingredients": [
+                {"id": ingredient.id, "amount": amount}
+                for ingredient in ingredients],
+        }
+
+    def test_create_queries_do_not_depend_on_ingredients(self):
+        # Image is stored once, next uploads only reference it.
+        self.client.post("/api/recipes/", self.get_data(
+            self.ingredients[:1], self.tags[:1], amount=1), format="json")
+        for count in (1, len(self.ingredients)):
+            data = self.get_data(self.ingredients[:count], self.tags[:count])
+            with self.assertNumQueries(21 + self.SEARCH_QUERIES):
+                response = self.client.post(
+                    "/api/recipes/", data, format="json")
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(response.data["ingredients"]), count)
+
+    def test_update_queries_do_not_depend_on_ingredients(self):
+        for recipe, ingredients, tags in (
+                (self.recipes[0], self.ingredients[:1], self.tags[2:3]),
+                (self.recipes[1], self.ingredients, self.tags[2:])):
+            data = self.get_data(ingredients, tags)
+            del data["image"]
+            with self.assertNumQueries(20 + self.SEARCH_QUERIES):
+                response = self.client.patch(
+                    f"/api/recipes/{recipe.id}/", data, format="json")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                len(response.data["ingredients"]), len(ingredients))
+
+    def test_unchanged_update_writes_nothing(self):
+        recipe = self.recipes[0]
+        data = self.get_data(self.ingredients[:3], self.tags[:2])
+        data.update(name=recipe.name, text=recipe.text,
+                    cooking_time=recipe.cooking_time)
+        data["ingredients"] = [
+            {"id": ingredient.id, "amount": 10}
+            for ingredient in self.ingredients[:3]]
+        del data["image"]
+        with self.assertNumQueries(12):
+            response = self.client.patch(
+                f"/api/recipes/{recipe.id}/", data, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_tag_is_rejected(self):
+        data = self.get_data(self.ingredients[:1], self.tags[:1])
+        data["tags"].append(0)
+        response = self.client.post("/api/recipes/", data, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("tags", response.data)
+
+
+class SubscriptionsQueriesTest(ApiTestCase):
+    """Subscriptions page costs fixed number of queries."""
+
+    URL = "/api/users/subscriptions/?recipes_limit=2"
+
+    def subscribe(self, number):
+        author = User.objects.create_user(
+            username=f"author{number}", email=f"author{number}@example.com",
+            password="pass")
+        for recipe_number in range(3):
+            self.create_recipe(author, recipe_number)
+        Subscription.objects.create(user=self.user, item=author)
+
+    def get_page(self, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"]
+
+    def test_queries_do_not_depend_on_authors(self):
+        Subscription.objects.create(user=self.user, item=self.author)
+        self.get_page(3)
+        for number in range(3):
+            self.subscribe(number)
+        results = self.get_page(3)
+        self.assertEqual(len(results), 4)
+        for item in results:
+            self.assertEqual(len(item["recipes"]), 2)
+        counts = {item["id"]: item["recipes_count"] for item in results}
+        self.assertEqual(counts.pop(self.author.id), RECIPES_COUNT)
+        self.assertEqual(set(counts.values()), {3})
+
+    def test_recipes_are_latest_of_author(self):
+        Subscription.objects.create(user=self.user, item=self.author)
+        recipes = self.get_page(3)[0]["recipes"]
+        self.assertEqual([recipe["id"] for recipe in recipes],
+                         [recipe.id for recipe in self.recipes[:-3:-1]])
+
+
+class RecipeImageVariantsTest(ApiTestCase):
+    """Lists show card variant of image, details show full one."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.recipes[-1]
+        Recipe.objects.filter(pk=self.recipe.pk).update(image_variants={
+            "source": "recipes/images/image.png",
+            "card": {"webp": "recipes/images/variants/image/card.webp"},
+            "full": {"webp": "recipes/images/variants/image/full.webp"},
+        })
+
+    @override_settings(IMAGE_VARIANT_FORMAT="webp")
+    def test_variants(self):
+        results = self.client.get("/api/recipes/").data["results"]
+        self.assertEqual(results[0]["id"], self.recipe.id)
+        self.assertTrue(results[0]["image"].endswith("image/card.webp"))
+        self.assertTrue(results[1]["image"].endswith("images/image.png"))
+        data = self.client.get(f"/api/recipes/{self.recipe.id}/").data
+        self.assertTrue(data["image"].endswith("image/full.webp"))
+
+
+class ReferenceVersionTest(ApiTestCase):
+    """Reference data versions are shared through database."""
+
+    def test_change_in_other_process_is_seen(self):
+        response = self.client.get("/api/tags/")
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(
+            "/api/tags/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        ReferenceVersion.objects.filter(name="tags").update(
+            version="changed")
+        with override_settings(REFERENCE_VERSION_TTL=0):
+            response = self.client.get(
+                "/api/tags/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_tag_change_bumps_version(self):
+        etag = self.client.get("/api/tags/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name="Новый тег", slug="new")
+        response = self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), len(self.tags) + 1)
+
+
+class ShortLinkTest(ApiTestCase):
+    """Short links of any size resolve or give 404."""
+
+    def test_link_redirects_to_recipe(self):
+        recipe = self.recipes[0]
+        response = self.client.get(f"/api/recipes/{recipe.id}/get-link/")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(response.data["short-link"])
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response["Location"], f"/recipes/{recipe.id}/")
+
+    def test_too_big_ids_are_not_found(self):
+        for url in (f"/s/{encode_id(MAX_ID)}",
+                    f"/s/{encode_id(MAX_ID + 1)}",
+                    "/s/zzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzzz",
+                    f"/api/recipes/{MAX_ID + 1}/get-link/",
+                    f"/api/recipes/{'9' * 40}/get-link/"):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@override_settings(TOKEN_CACHE_BACKEND="default")
+class CachedTokenAuthenticationTest(ApiTestCase):
+    """Cached tokens are invalidated and users are not stale."""
+
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.user)
+        self.authentication = CachedTokenAuthentication()
+        self.authentication.authenticate_credentials(self.token.key)
+
+    def tearDown(self):
+        token_cache.invalidate(self.token.key)
+
+    def test_cached_token_needs_no_queries(self):
+        with self.assertNumQueries(0):
+            user, token = self.authentication.authenticate_credentials(
+                self.token.key)
+        self.assertEqual((user, token), (self.user, self.token))
+
+    def test_updated_fields_are_read_from_database(self):
+        User.objects.filter(pk=self.user.pk).update(recipes_count=5)
+        user, _ = self.authentication.authenticate_credentials(
+            self.token.key)
+        self.assertEqual(user.recipes_count, 5)
+        user.first_name = "Новое"
+        user.save()
+        self.assertEqual(
+            User.objects.get(pk=self.user.pk).recipes_count, 5)
+
+    def test_deleted_token_is_rejected(self):
+        self.client.force_authenticate(None)
+        headers = {"HTTP_AUTHORIZATION": f"Token {self.token.key}"}
+        self.assertEqual(
+            self.client.get("/api/users/me/", **headers).status_code, 200)
+        self.token.delete()
+        self.assertEqual(
+            self.client.get("/api/users/me/", **headers).status_code, 401)
+
+
+@override_settings(TOKEN_CACHE_BACKEND=None)
+class LocalTokenCacheTest(CachedTokenAuthenticationTest):
+    """Per-process token cache is the default one."""
+
+    def test_expired_token_is_read_again(self):
+        token_cache.invalidate(self.token.key)
+        with override_settings(TOKEN_CACHE_TTL=-1):
+            for _ in range(2):
+                with self.assertNumQueries(1):
+                    self.authentication.authenticate_credentials(
+                        self.token.key)
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    "DEFAULT_THROTTLE_RATES": {"auth": "2/min"},
+    "NUM_PROXIES": 1})
+class AnonymousThrottleTest(ApiTestCase):
+    """Clients behind nginx get buckets of their own addresses."""
+
+    def login(self, forwarded_for):
+        return self.client.post(
+            "/api/auth/token/login/",
+            {"email": "user@example.com", "password": "wrong"},
+            REMOTE_ADDR="172.18.0.2", HTTP_X_FORWARDED_FOR=forwarded_for)
+
+    def test_clients_get_separate_buckets(self):
+        self.client.force_authenticate(None)
+        for _ in range(2):
+            self.assertEqual(self.login("10.0.0.1").status_code, 400)
+        self.assertEqual(self.login("10.0.0.1").status_code, 429)
+        self.assertEqual(
+            self.login("1.2.3.4, 10.0.0.1").status_code, 429)
+        self.assertEqual(self.login("10.0.0.2").status_code, 400)
+
+
+class ShoppingListDownloadTest(ApiTestCase):
+    """Shopping list is downloaded as file, errors come as json."""
+
+    URL = "/api/recipes/download_shopping_cart/"
+
+    def setUp(self):
+        super().setUp()
+        IncartRecipe.objects.create(user=self.user, item=self.recipes[0])
+
+    def test_text_list(self):
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn("Ингредиент 0", b"".join(
+            response.streaming_content).decode())
+
+    def test_json_list(self):
+        response = self.client.get(self.URL, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+
+    def test_anonymous_gets_json_error(self):
+        response = APIClient().get(self.URL)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("detail", response.json())
+
+
+class CursorPaginationTest(ApiTestCase):
+    """Keyset pages of recipe feed."""
+
+    def get_page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def get_ids(self, page):
+        return [item["id"] for item in page["results"]]
+
+    def test_pages_forward_and_back(self):
+        expected = [recipe.id for recipe in reversed(self.recipes)]
+        page = self.get_page("/api/recipes/?cursor=&limit=5")
+        self.assertIsNone(page["previous"])
+        self.assertNotIn("count", page)
+        pages = [self.get_ids(page)]
+        while page["next"]:
+            page = self.get_page(page["next"])
+            pages.append(self.get_ids(page))
+        self.assertEqual(sum(pages, []), expected)
+        self.assertEqual([len(ids) for ids in pages], [5, 5, 2])
+        for ids in reversed(pages[:-1]):
+            page = self.get_page(page["previous"])
+            self.assertEqual(self.get_ids(page), ids)
+        self.assertIsNone(page["previous"])
+
+    def test_ties_on_created_at(self):
+        Recipe.objects.update(created_at=timezone.now())
+        ids = []
+        url = "/api/recipes/?cursor=&limit=5"
+        while url:
+            page = self.get_page(url)
+            ids += self.get_ids(page)
+            url = page["next"]
+        self.assertEqual(ids, sorted(
+            (recipe.id for recipe in self.recipes), reverse=True))
+
+    def test_bad_cursor(self):
+        for cursor in ("bad", "eyJjIjogMX0="):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f"/api/recipes/?cursor={cursor}")
+                self.assertEqual(response.status_code, 404)
+
+    def test_count_is_capped(self):
+        page = self.get_page("/api/recipes/?cursor=&count=1")
+        self.assertEqual(page["count"], RECIPES_COUNT)
+        with mock.patch("api.pagination.MAX_CURSOR_COUNT", 5):
+            page = self.get_page("/api/recipes/?cursor=&count=true")
+        self.assertEqual(page["count"], 5)
+
+
+class RecipeSearchTest(ApiTestCase):
+    """Search ranks name matches first and follows recipe changes."""
+
+    def search(self, query):
+        response = self.client.get("/api/recipes/", {"search": query})
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.data["results"]]
+
+    def create(self, name, text):
+        return Recipe.objects.create(
+            author=self.author, name=name, text=text, cooking_time=10,
+            image="recipes/images/image.png")
+
+    def test_name_match_ranks_first(self):
+        in_text = self.create("Суп", "Почти как борщ")
+        in_name = self.create("Борщ", "Свекла и капуста")
+        self.assertEqual(self.search("борщ"), [in_name.id, in_text.id])
+
+    def test_index_follows_changes(self):
+        recipe = self.create("Борщ", "Свекла и капуста")
+        self.assertEqual(self.search("борщ"), [recipe.id])
+        recipe.name = "Окрошка"
+        recipe.save()
+        self.assertEqual(self.search("борщ"), [])
+        self.assertEqual(self.search("окрошка"), [recipe.id])
+        recipe.delete()
+        self.assertEqual(self.search("окрошка"), [])
+
+
+@override_settings(ROOT_URLCONF="foodgram_project.asgi_urls")
+class AsyncReadViewsTest(ApiTestCase):
+    """Async read views answer as sync ones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.token = Token.objects.create(user=cls.user)
+        FavoriteRecipe.objects.create(user=cls.user, item=cls.recipes[0])
+
+    def get(self, url, token=None):
+        # AsyncClient of Django 4.2 ignores HTTP_* extra arguments.
+        headers = {"Authorization": f"Token {token or self.token.key}"}
+        return self.async_client.get(url, headers=headers)
+
+    async def test_authenticated_list(self):
+        response = await self.get("/api/recipes/")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["count"], RECIPES_COUNT)
+        favorited = [item["id"] for item in data["results"]
+                     if item["is_favorited"]]
+        self.assertEqual(favorited, [self.recipes[0].id])
+
+    async def test_is_favorited_filter(self):
+        response = await self.get("/api/recipes/?is_favorited=1")
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([item["id"] for item in results],
+                         [self.recipes[0].id])
+        self.assertTrue(results[0]["is_favorited"])
+
+    async def test_detail(self):
+        recipe = self.recipes[0]
+        response = await self.get(f"/api/recipes/{recipe.id}/")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["id"], recipe.id)
+        self.assertTrue(data["is_favorited"])
+        self.assertEqual(len(data["ingredients"]), 3)
+
+    async def test_cursor_pages_fall_back_to_sync_view(self):
+        response = await self.get("/api/recipes/?cursor=&limit=5")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertNotIn("count", data)
+        self.assertIsNotNone(data["next"])
+
+    async def test_missing_recipe(self):
+        response = await self.get("/api/recipes/0/")
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("detail", response.json())
+
+    async def test_unauthorized(self):
+        response = await self.async_client.get("/api/users/subscriptions/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["WWW-Authenticate"], "Token")
+        response = await self.get("/api/recipes/", token="wrong")
+        self.assertEqual(response.status_code, 401)
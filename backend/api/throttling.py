@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class TokenBuckets:
+    """
+    Storage of token buckets states.
+    Per-process LRU by default, shared cache backend
+    when THROTTLE_CACHE_BACKEND is set.
+    Shared backend is best effort, concurrent requests
+    of one client may both take the last token.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = OrderedDict()
+
+    @property
+    def shared(self):
+        if settings.THROTTLE_CACHE_BACKEND is None:
+            return None
+        return caches[settings.THROTTLE_CACHE_BACKEND]
+
+    def take(self, key, capacity, refill_rate):
+        """Taking token from bucket, returning seconds to wait or 0."""
+        if self.shared is not None:
+            state = self.shared.get(key)
+            state, wait = self.refill(state, capacity, refill_rate)
+            self.shared.set(key, state, int(capacity / refill_rate) + 1)
+            return wait
+        with self._lock:
+            state, wait = self.refill(
+                self._states.get(key), capacity, refill_rate)
+            self._states[key] = state
+            self._states.move_to_end(key)
+            while len(self._states) > settings.THROTTLE_CACHE_SIZE:
+                self._states.popitem(last=False)
+        return wait
+
+    def refill(self, state, capacity, refill_rate):
+        now = time.time()
+        if state is None:
+            tokens = capacity
+        else:
+            tokens, updated_at = state
+            tokens = min(capacity,
+                         tokens + (now - updated_at) * refill_rate)
+        if tokens >= 1:
+            return (tokens - 1, now), 0
+        return (tokens, now), (1 - tokens) / refill_rate
+
+
+token_buckets = TokenBuckets()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token bucket throttle of scope.
+    Rate "N/period" from DEFAULT_THROTTLE_RATES gives bucket
+    of N tokens refilled evenly during period.
+    Buckets are per user, per IP for anonymous requests.
+    """
+
+    scope = None
+
+    def __init__(self):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        self.capacity = self.refill_rate = None
+        if rate is not None:
+            self.capacity, self.refill_rate = self.parse_rate(rate)
+        self.wait_time = 0
+
+    def parse_rate(self, rate):
+        try:
+            number, period = rate.split("/")
+            capacity = int(number)
+            seconds = PERIODS[period[0]]
+        except (ValueError, KeyError, IndexError):
+            raise ImproperlyConfigured(
+                f"Invalid throttle rate {rate} of scope {self.scope}.")
+        return capacity, capacity / seconds
+
+    def get_cache_key(self, request):
+        if request.user and request.user.is_authenticated:
+            ident = f"user:{request.user.pk}"
+        else:
+            ident = f"ip:{self.get_ident(request)}"
+        return f"foodgram:throttle:{self.scope}:{ident}"
+
+    def allow_request(self, request, view):
+        if self.capacity is None:
+            return True
+        self.wait_time = token_buckets.take(
+            self.get_cache_key(request), self.capacity, self.refill_rate)
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class AuthThrottle(TokenBucketThrottle):
+    scope = "auth"
+
+
+class RecipeWriteThrottle(TokenBucketThrottle):
+    scope = "recipe_write"
+
+
+class ToggleThrottle(TokenBucketThrottle):
+    scope = "toggle"
+
+
+class DownloadThrottle(TokenBucketThrottle):
+    scope = "download"
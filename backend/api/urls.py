@@ -2,7 +2,7 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (CustomUserViewSet, IngredientsViewSet, RecipeViewSet,
-                    TagsViewSet, TokenViewSet)
+                    TagsViewSet, TokenViewSet, db_pool_stats)
 
 router = DefaultRouter()
 
@@ -14,5 +14,6 @@ router.register(r"auth", TokenViewSet, basename="auth")
 
 
 urlpatterns = [
+    path("db-pool/", db_pool_stats, name="db-pool"),
     path("", include(router.urls))
 ]
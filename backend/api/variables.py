@@ -2,3 +2,6 @@ MIN_AMOUNT_VALUE = 1
 MAX_AMOUNT_VALUE = 32000
 MIN_COOKING_TIME_VALUE = 1
 MAX_COOKING_TIME_VALUE = 32000
+INGREDIENTS_SEARCH_LIMIT = 100
+MAX_INGREDIENTS_SEARCH_LIMIT = 1000
+MAX_CURSOR_COUNT = 10000
@@ -0,0 +1,65 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from foodgram.models import ReferenceVersion
+
+
+class DataVersion:
+    """
+    Version of rarely changed reference data.
+    Stored in database row, so changes made by any process
+    or import command are seen by all processes.
+    Kept in process memory and re-read every REFERENCE_VERSION_TTL
+    seconds, so other processes see new version after that delay.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        # (value, checked_at) replaced at once, so threads
+        # never see value without its check time.
+        self._state = None
+
+    def bump(self):
+        """Setting new version after data changes, in their transaction."""
+        ReferenceVersion.objects.update_or_create(
+            name=self.name, defaults={"version": uuid.uuid4().hex,
+                                      "modified_at": timezone.now()})
+        transaction.on_commit(self.invalidate)
+
+    def invalidate(self):
+        self._state = None
+
+    def read(self):
+        version, _ = ReferenceVersion.objects.get_or_create(
+            name=self.name, defaults={"version": uuid.uuid4().hex,
+                                      "modified_at": timezone.now()})
+        return version.version, int(version.modified_at.timestamp())
+
+    def get(self):
+        """Getting actual version and its modification timestamp."""
+        state = self._state
+        if (state is None or time.monotonic() - state[1]
+                > settings.REFERENCE_VERSION_TTL):
+            state = self._state = (self.read(), time.monotonic())
+        return state[0]
+
+    def get_validators(self):
+        """Getting ETag and Last-Modified of one version."""
+        version, modified_at = self.get()
+        return f'"{self.name}-{version}"', modified_at
+
+    @property
+    def etag(self):
+        return self.get_validators()[0]
+
+    @property
+    def last_modified(self):
+        return self.get()[1]
+
+
+ingredients_version = DataVersion("ingredients")
+tags_version = DataVersion("tags")
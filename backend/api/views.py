@@ -1,29 +1,46 @@
-from collections import Counter
+import os
 
+from django.conf import settings
 from django.contrib.auth import get_user_model, models
-from django.http import HttpResponse
+from django.db.models import Exists, F, OuterRef, Prefetch, Sum, Value, Window
+from django.db.models.functions import RowNumber
+from django.http import (Http404, HttpResponse, HttpResponsePermanentRedirect,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
 from rest_framework import serializers, status, viewsets
 from rest_framework.authtoken.models import Token
-from rest_framework.decorators import action
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from foodgram.db.pool import get_pools_stats
 # линтер ругается на отсутствие строки
 from foodgram.models import (FavoriteRecipe, IncartRecipe, Ingredient,
                              IngredientAmount, Recipe, RecipeIngredient,
-                             Subscription, Tag)
+                             RecipeTag, Subscription, Tag)
+from foodgram.search import search_recipes
 
-from .pagination import Pagination
+from .ingredient_index import ingredient_index
+from .links import decode_code, encode_id, parse_id, recipe_links
+from .mixins import ConditionalReadMixin
+from .pagination import Pagination, RecipePagination
 from .permissions import IsAuthenticatedOrAuthorOrReadOnly
+from .renderers import (CsvShoppingListRenderer, PdfShoppingListRenderer,
+                        ShoppingListRenderer, TxtShoppingListRenderer)
 from .serializers import (CustomSetPasswordSerializer,
                           CustomUserCreateSerializer, CustomUserSerializer,
                           FavoriteRecipeSerializer, FollowCreateSerializer,
                           FollowUserSerializer, IncartRecipeSerializer,
-                          IngredientSerializer, ManyFollowUserSerializer,
-                          RecipeSerializer, SetAvatarSerializer,
-                          ShoppingCartSerializer, ShortRecipeSerializer,
+                          IngredientSerializer, RecipeSerializer,
+                          SetAvatarSerializer, ShortRecipeSerializer,
                           TagsSerializer, TokenSerializer)
+from .throttling import (AuthThrottle, DownloadThrottle, RecipeWriteThrottle,
+                         ToggleThrottle)
+from .variables import INGREDIENTS_SEARCH_LIMIT, MAX_INGREDIENTS_SEARCH_LIMIT
+from .versions import ingredients_version, tags_version
 
 User = get_user_model()
 
@@ -36,40 +53,66 @@ USERS_SERIALIZERS = {
     'set_password': CustomSetPasswordSerializer,
     'avatar': SetAvatarSerializer,
     'subscribe': FollowCreateSerializer,
-    'subscriptions': ManyFollowUserSerializer,
+    'subscriptions': FollowUserSerializer,
 }
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
-    """Class for ingredients ViewSet."""
+class IngredientsViewSet(ConditionalReadMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Class for ingredients ViewSet.
+    List is served from per-process ingredient index.
+    """
 
+    queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-
-    def get_queryset(self):
-        queryset = Ingredient.objects.all()
-        name = self.request.query_params.get("name").lower()
-        if name is not None:
-            queryset = queryset.filter(name__icontains=name)
-        return queryset
-
-
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
+    data_version = ingredients_version
+
+    def get_limit(self):
+        limit = self.request.query_params.get(
+            "limit", INGREDIENTS_SEARCH_LIMIT)
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise serializers.ValidationError()
+        if limit < 1:
+            raise serializers.ValidationError()
+        return min(limit, MAX_INGREDIENTS_SEARCH_LIMIT)
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get("name")
+        if name is None:
+            return HttpResponse(ingredient_index.rendered,
+                                content_type="application/json")
+        return Response(ingredient_index.search(name, self.get_limit()))
+
+
+class TagsViewSet(ConditionalReadMixin, viewsets.ReadOnlyModelViewSet):
     """Class for tags ViewSet."""
 
     queryset = Tag.objects.all()
     serializer_class = TagsSerializer
+    data_version = tags_version
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """Class for recipes ViewSet."""
 
     permission_classes = (IsAuthenticatedOrAuthorOrReadOnly,)
-    pagination_class = Pagination
+    pagination_class = RecipePagination
     model = Recipe
 
     def get_queryset(self):
-        queryset = Recipe.objects.all()
         user = self.request.user
+        authors = User.objects.all()
+        if user.__class__ is not models.AnonymousUser:
+            authors = authors.annotate(is_subscribed=Exists(
+                Subscription.objects.filter(user=user, item=OuterRef("pk"))))
+        queryset = Recipe.objects.prefetch_related(
+            Prefetch("author", queryset=authors),
+            Prefetch("ingredients",
+                     queryset=IngredientAmount.objects.select_related(
+                         "ingredient")),
+            "tags")
         query_dict = self.request.query_params.copy()
         author = query_dict.get("author")
         is_favorited = query_dict.get("is_favorited")
@@ -77,18 +120,40 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if author is not None:
             queryset = queryset.filter(author=author)
         if user.__class__ is not models.AnonymousUser:
+            queryset = queryset.annotate(
+                is_favorited=Exists(FavoriteRecipe.objects.filter(
+                    user=user, item=OuterRef("pk"))),
+                is_in_shopping_cart=Exists(IncartRecipe.objects.filter(
+                    user=user, item=OuterRef("pk"))))
             if is_favorited is not None and bool(int(is_favorited)):
-                queryset = queryset.filter(
-                    id__in=user.favoriterecipes.all().values("item__id"))
+                queryset = queryset.filter(is_favorited=True)
             if (is_in_shopping_cart is not None
                     and bool(int(is_in_shopping_cart))):
-                queryset = queryset.filter(
-                    id__in=user.incartrecipes.all().values("item__id"))
+                queryset = queryset.filter(is_in_shopping_cart=True)
         if "tags" in query_dict:
-            tags = query_dict.pop("tags")
-            queryset = queryset.filter(tags__slug__in=tags).distinct()
+            tag_ids = list(Tag.objects.filter(
+                slug__in=query_dict.pop("tags")).values_list("id", flat=True))
+            queryset = queryset.filter(Exists(RecipeTag.objects.filter(
+                recipe=OuterRef("pk"), tag_id__in=tag_ids)))
+        search = query_dict.get("search")
+        if search:
+            queryset = search_recipes(queryset, search).order_by(
+                "-search_rank", "-created_at", "-id")
         return queryset
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Rendering errors of shopping list download as json."""
+        if (self.action == "download_shopping_cart"
+                and getattr(response, "exception", False)):
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def get_throttles(self):
+        if self.action in ("create", "update", "partial_update", "destroy"):
+            return [RecipeWriteThrottle()]
+        return super().get_throttles()
+
     def get_serializer_class(self):
         serializer = RecipeSerializer
         if self.action == "favorite":
@@ -103,6 +168,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             instance, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        if getattr(instance, "_prefetched_objects_cache", None):
+            instance._prefetched_objects_cache = {}
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def favorite_incart(self, request, through_model,
@@ -129,7 +196,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(
         detail=True,
         methods=("POST", "DELETE",),
-        permission_classes=(IsAuthenticated,),)
+        permission_classes=(IsAuthenticated,),
+        throttle_classes=(ToggleThrottle,),)
     def favorite(self, request, *args, **kwargs):
         """Method for users favorite recipe."""
         through_model = FavoriteRecipe
@@ -140,7 +208,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(
         detail=True,
         methods=("POST", "DELETE",),
-        permission_classes=(IsAuthenticated,),)
+        permission_classes=(IsAuthenticated,),
+        throttle_classes=(ToggleThrottle,),)
     def shopping_cart(self, request, *args, **kwargs):
         """Method for users recipes in cart."""
         through_model = IncartRecipe
@@ -152,48 +221,40 @@ class RecipeViewSet(viewsets.ModelViewSet):
         detail=False,
         methods=("GET",),
         permission_classes=(IsAuthenticated,),
+        throttle_classes=(DownloadThrottle,),
+        renderer_classes=(TxtShoppingListRenderer,
+                          CsvShoppingListRenderer,
+                          PdfShoppingListRenderer,
+                          JSONRenderer),
     )
     def download_shopping_cart(self, request, *args, **kwargs):
-        """Method for downloading users
-        in cart recipes ingredients."""
+        """
+        Method for downloading users in cart recipes ingredients.
+        Amounts are summed up by database and the list is streamed
+        in txt, csv or pdf format chosen by format query param,
+        json gives list of ingredients.
+        """
         user = request.user
-        queryset = user.incartrecipes.all()
-        recipe_qs = queryset.values("item_id")
-        ingredients_recipe = RecipeIngredient.objects.filter(
-            recipe__in=recipe_qs).values_list(
-                "ingredient_id", flat=True).order_by(
-                    "ingredient__ingredient")
-        amount_coeff = dict(Counter(ingredients_recipe))
-        ingredient_amount = IngredientAmount.objects.filter(
-            id__in=ingredients_recipe).order_by("ingredient__name")
-        serializer = ShoppingCartSerializer(
-            ingredient_amount,
-            many=True)
-        ids_stack = set()
-        result = {}
-        for item in serializer.data:
-            amount = item["amount"] * amount_coeff[item["id"]]
-            name, measure = (item["ingredient"]["name"],
-                             item["ingredient"]["measurement_unit"])
-            if item["ingredient"]["id"] in ids_stack:
-                old_amount = result[name, measure]
-                result[name, measure] = amount + old_amount
-            else:
-                result[name, measure] = amount
-            ids_stack.add(item["ingredient"]["id"])
-        str_result = "Список покупок \n"
-        for key, value in result.items():
-            str_result += f"{key[0]} ({key[1]}) — {value} \n"
-        file_name = "shopping_list.txt"
-        with open(file_name, "w", encoding="utf-8") as file:
-            file.write(str_result,)
-        with open(file_name, encoding="utf-8") as file:
-            response = HttpResponse(
-                file, content_type="text/plain; charset=utf-8"
-            )
-            response["Content-Disposition"] = (f"attachment;"
-                                               f"filename={file_name}")
-            return response
+        ingredients = RecipeIngredient.objects.filter(
+            recipe__in=user.incartrecipes.values("item")).values(
+                "ingredient__ingredient",
+                name=F("ingredient__ingredient__name"),
+                measurement_unit=F(
+                    "ingredient__ingredient__measurement_unit")).annotate(
+                        amount=Sum("ingredient__amount")).order_by("name")
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, ShoppingListRenderer):
+            return Response([
+                {"name": item["name"],
+                 "measurement_unit": item["measurement_unit"],
+                 "amount": item["amount"]}
+                for item in ingredients])
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients.iterator()),
+            content_type=renderer.get_content_type())
+        response["Content-Disposition"] = (
+            f"attachment; filename={renderer.get_file_name()}")
+        return response
 
     @action(
         detail=True,
@@ -203,10 +264,14 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def get_link(self, request, *args, **kwargs):
         """Method for getting recipes short link."""
-        recipe_id = self.kwargs.get("pk")
-        get_object_or_404(Recipe, id=recipe_id)
-        short_link = request.build_absolute_uri().replace(
-            "api/", "").replace("get-link/", "")
+        try:
+            recipe_id = parse_id(self.kwargs.get("pk"))
+        except ValueError:
+            raise Http404
+        if not recipe_links.exists(recipe_id):
+            raise Http404
+        short_link = request.build_absolute_uri(
+            reverse("short-link", args=(encode_id(recipe_id),)))
         return Response({
             "short-link": short_link},
             status=status.HTTP_200_OK)
@@ -225,6 +290,11 @@ class CustomUserViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         return USERS_SERIALIZERS[self.action]
 
+    def get_throttles(self):
+        if self.action == "create":
+            return [AuthThrottle()]
+        return super().get_throttles()
+
     def subscribing(self, request, through_model,
                     result_serializer, *args, **kwargs):
         """Importing favorite_incart method."""
@@ -258,13 +328,15 @@ class CustomUserViewSet(viewsets.ModelViewSet):
             serializer.is_valid(raise_exception=True)
             serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
-        instance.avatar.delete()
+        instance.avatar = None
+        instance.save(update_fields=("avatar",))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=False,
         methods=("POST", ),
         permission_classes=(IsAuthenticated,),
+        throttle_classes=(AuthThrottle,),
     )
     def set_password(self, request, *args, **kwargs):
         """Setting new users password."""
@@ -281,6 +353,7 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         detail=True,
         methods=("POST", "DELETE"),
         permission_classes=(IsAuthenticated,),
+        throttle_classes=(ToggleThrottle,),
     )
     def subscribe(self, request, *args, **kwargs):
         """Making and destroying users subscriptions."""
@@ -295,14 +368,37 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         methods=("GET",),
         permission_classes=(IsAuthenticated,),)
     def subscriptions(self, request, *args, **kwargs):
-        """Method for getting users subscriptions list."""
-        user = request.user
-        queryset = user.follows.all()
-        paginated_queryset = self.paginate_queryset(queryset)
-        serializer = self.get_serializer(
-            paginated_queryset, context={"request": request}, many=True)
+        """
+        Method for getting users subscriptions list.
+        Recipes of all authors on the page are fetched by one query,
+        limited per author with ROW_NUMBER() window function.
+        """
+        authors = self.paginate_queryset(self.get_subscriptions())
+        serializer = self.get_serializer(authors, many=True)
+        author_recipes = {}
+        for recipe in self.get_author_recipes(
+                authors, serializer.child.get_recipes_limit()):
+            author_recipes.setdefault(recipe.author_id, []).append(recipe)
+        serializer.context["author_recipes"] = author_recipes
         return self.get_paginated_response(serializer.data)
 
+    def get_subscriptions(self):
+        """Getting authors followed by request user."""
+        return User.objects.filter(
+            subscription__user=self.request.user).annotate(
+                is_subscribed=Value(True)).order_by("subscription__id")
+
+    def get_author_recipes(self, authors, recipes_limit):
+        """Getting recipes of authors, at most recipes_limit per author."""
+        recipes = Recipe.objects.filter(author__in=authors)
+        if recipes_limit is not None:
+            recipes = recipes.annotate(row_number=Window(
+                RowNumber(),
+                partition_by=F("author"),
+                order_by=[F("created_at").desc(), F("id").desc()])).filter(
+                    row_number__lte=recipes_limit)
+        return recipes
+
 
 class TokenViewSet(viewsets.ModelViewSet):
     """ViewSet for getting and destroying users Token."""
@@ -314,6 +410,7 @@ class TokenViewSet(viewsets.ModelViewSet):
         detail=False,
         methods=("POST", ),
         permission_classes=(AllowAny,),
+        throttle_classes=(AuthThrottle,),
         url_path="token/login"
     )
     def login(self, request, *args, **kwargs):
@@ -339,3 +436,24 @@ class TokenViewSet(viewsets.ModelViewSet):
         token = Token.objects.get(user=user)
         token.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def short_link_redirect(request, code):
+    """Redirecting short link to recipe page."""
+    try:
+        recipe_id = decode_code(code)
+    except ValueError:
+        raise Http404
+    if not recipe_links.exists(recipe_id):
+        raise Http404
+    response = HttpResponsePermanentRedirect(f"/recipes/{recipe_id}/")
+    patch_cache_control(
+        response, public=True, max_age=settings.SHORT_LINK_MAX_AGE)
+    return response
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def db_pool_stats(request):
+    """Metrics of database pools of worker process serving request."""
+    return Response({"pid": os.getpid(), "pools": get_pools_stats()})
@@ -1,36 +1,53 @@
 from django.contrib import admin
 
-from foodgram.models import (FavoriteRecipe, Ingredient, IngredientAmount,
-                             Recipe, RecipeIngredient, RecipeTag, Tag)
+from foodgram.models import (Ingredient, IngredientAmount, Recipe,
+                             RecipeIngredient, RecipeTag, Tag, Task)
 
 
 class TagsInline(admin.StackedInline):
 
     model = RecipeTag
     extra = 0
+    autocomplete_fields = ("tag",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("tag")
 
 
 class IngredientsAmountAdmin(admin.ModelAdmin):
 
     list_display = ("ingredient", "amount",)
+    search_fields = ("ingredient__name",)
+    autocomplete_fields = ("ingredient",)
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("ingredient")
 
 
 class RecipeIngredientsInline(admin.StackedInline):
 
     model = RecipeIngredient
     extra = 0
+    autocomplete_fields = ("ingredient",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            "ingredient__ingredient")
 
 
 class IngredientsAdmin(admin.ModelAdmin):
 
     list_display = ("name", "measurement_unit",)
     search_fields = ("name",)
+    show_full_result_count = False
     empty_value_display = "-пусто-"
 
 
 class RecipeAdmin(admin.ModelAdmin):
 
-    list_display = ("name", "author", )
+    list_display = ("name", "author", "favorited_count")
+    list_select_related = ("author",)
     readonly_fields = ["favorited_count"]
     fieldsets = (
         (None, {
@@ -40,23 +57,37 @@ class RecipeAdmin(admin.ModelAdmin):
                 "text",
                 "cooking_time",),
                 "favorited_count"], }),)
-    search_fields = ("name", "author__first_name",)
+    # Only name, OR with joined author fields prevents use
+    # of recipe_name_upper_trgm index.
+    search_fields = ("name",)
     list_filter = ("tags", )
     inlines = [TagsInline, RecipeIngredientsInline, ]
+    show_full_result_count = False
     empty_value_display = "-пусто-"
 
-    @admin.display(description="Общее число добавлений в избранное")
+    @admin.display(description="Общее число добавлений в избранное",
+                   ordering="favorites_count")
     def favorited_count(self, obj):
-        return FavoriteRecipe.objects.filter(recipe=obj.id).count()
+        return obj.favorites_count
 
 
 class TagsAdmin(admin.ModelAdmin):
 
     list_display = ("id", "name", "slug",)
+    search_fields = ("name", "slug",)
     empty_value_display = "-пусто-"
 
 
+class TaskAdmin(admin.ModelAdmin):
+
+    list_display = ("name", "status", "attempts", "run_at", "locked_by")
+    list_filter = ("status",)
+    search_fields = ("name",)
+    show_full_result_count = False
+
+
 admin.site.register(Ingredient, IngredientsAdmin)
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Tag, TagsAdmin)
 admin.site.register(IngredientAmount, IngredientsAmountAdmin)
+admin.site.register(Task, TaskAdmin)
@@ -7,3 +7,6 @@ class FoodgramConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "foodgram"
     verbose_name = "Фудграм"
+
+    def ready(self):
+        from . import signals  # noqa: F401
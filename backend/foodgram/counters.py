@@ -0,0 +1,50 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+class CountersMixin:
+    """
+    Model mixin leaving counter_fields out of save() of loaded instance.
+    Counters are changed by atomic UPDATE in signals, so saving
+    instance loaded before does not write old values back.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if (update_fields is None and not self._state.adding
+                and not kwargs.get("force_insert")):
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in deferred
+                and field.name not in self.counter_fields]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+
+def count_subquery(model, field):
+    """Subquery counting model rows related to outer row by field."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef("pk")}).order_by().values(
+            field).annotate(total=Count("pk")).values("total")), 0)
+
+
+def recount_counters(get_model):
+    """
+    Recomputing denormalized counters from relation tables.
+    get_model is apps.get_model of app registry,
+    migrations keep their own copy of this logic.
+    """
+    Recipe = get_model("foodgram", "Recipe")
+    FavoriteRecipe = get_model("foodgram", "FavoriteRecipe")
+    IncartRecipe = get_model("foodgram", "IncartRecipe")
+    Subscription = get_model("foodgram", "Subscription")
+    User = get_model("users", "CustomUser")
+    recipes = Recipe.objects.update(
+        favorites_count=count_subquery(FavoriteRecipe, "item"),
+        incart_count=count_subquery(IncartRecipe, "item"))
+    users = User.objects.update(
+        recipes_count=count_subquery(Recipe, "author"),
+        followers_count=count_subquery(Subscription, "item"))
+    return recipes, users
@@ -0,0 +1,58 @@
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from .pool import PoolTimeout, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend taking connections from per-process pool.
+    Closing returns connection to pool, so it should be used
+    with CONN_MAX_AGE = 0. Reused connections are checked
+    when taken from pool if CONN_HEALTH_CHECKS is set,
+    broken ones are closed and next one is taken.
+    """
+
+    def get_new_connection(self, conn_params):
+        self.isolation_level = IsolationLevel(
+            self.settings_dict["OPTIONS"].get(
+                "isolation_level", IsolationLevel.READ_COMMITTED))
+        pool = get_pool(self.alias)
+        opened = []
+
+        def connect():
+            opened.append(True)
+            return super(DatabaseWrapper, self).get_new_connection(
+                conn_params)
+
+        while True:
+            try:
+                connection = pool.acquire(connect, self.is_reusable)
+            except PoolTimeout as error:
+                raise self.Database.OperationalError(str(error)) from error
+            if (opened or not self.settings_dict["CONN_HEALTH_CHECKS"]
+                    or self.is_alive(connection)):
+                return connection
+            pool.release(connection, False)
+
+    def is_alive(self, connection):
+        """Checking reused connection as is_usable does."""
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except self.Database.Error:
+            return False
+        return True
+
+    def is_reusable(self, connection):
+        return (not connection.closed
+                and connection.get_transaction_status()
+                == TRANSACTION_STATUS_IDLE)
+
+    def _close(self):
+        if self.connection is None:
+            return
+        get_pool(self.alias).release(
+            self.connection,
+            not self.in_atomic_block and self.is_reusable(self.connection))
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    """No connection of pool became free during timeout."""
+
+
+class ConnectionPool:
+    """
+    Per-process pool of database connections.
+    Connections are opened on demand up to max_size,
+    requests over it wait for released ones up to timeout.
+    Broken, not idle and too old connections are closed on release.
+    """
+
+    def __init__(self, max_size, timeout, max_lifetime):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.pid = os.getpid()
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._opened_at = {}
+        self._size = 0
+        self.stats = {
+            "opened": 0,
+            "reused": 0,
+            "closed": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "timeouts": 0,
+        }
+
+    def acquire(self, connect, is_usable):
+        """Getting idle connection or opening new one by connect."""
+        started = time.monotonic()
+        waited = False
+        with self._condition:
+            while True:
+                while self._idle:
+                    connection = self._idle.pop()
+                    if is_usable(connection):
+                        self.stats["reused"] += 1
+                        self.record_wait(waited, started)
+                        return connection
+                    self.discard(connection)
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No free connection in pool of {self.max_size} "
+                        f"during {self.timeout} s.")
+                waited = True
+                self._condition.wait(remaining)
+            self.record_wait(waited, started)
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self.release_slot()
+            raise
+        with self._condition:
+            self._opened_at[id(connection)] = time.monotonic()
+            self.stats["opened"] += 1
+        return connection
+
+    def release(self, connection, reusable):
+        """Returning reusable connection to pool or closing it."""
+        with self._condition:
+            opened_at = self._opened_at.get(id(connection))
+            if (opened_at is None or not reusable
+                    or time.monotonic() - opened_at > self.max_lifetime):
+                self.discard(connection)
+                return
+            self._idle.append(connection)
+            self._condition.notify()
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        self.stats["closed"] += 1
+        if self._opened_at.pop(id(connection), None) is not None:
+            self.release_slot()
+
+    def release_slot(self):
+        self._size -= 1
+        self._condition.notify()
+
+    def record_wait(self, waited, started):
+        if not waited:
+            return
+        wait = time.monotonic() - started
+        self.stats["waits"] += 1
+        self.stats["wait_seconds"] += wait
+        self.stats["max_wait_seconds"] = max(
+            self.stats["max_wait_seconds"], wait)
+
+    def get_stats(self):
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                **self.stats,
+            }
+
+
+def get_pool(alias):
+    """
+    Getting pool of database alias for current process.
+    Pools inherited by forked workers are dropped without closing,
+    their connections belong to parent process.
+    """
+    pool = pools.get(alias)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with pools_lock:
+        pool = pools.get(alias)
+        if pool is None or pool.pid != os.getpid():
+            pool = pools[alias] = ConnectionPool(
+                settings.DB_POOL_SIZE, settings.DB_POOL_TIMEOUT,
+                settings.DB_POOL_MAX_LIFETIME)
+        return pool
+
+
+def get_pools_stats():
+    """Getting metrics of pools of current process."""
+    return {alias: pool.get_stats() for alias, pool in pools.items()
+            if pool.pid == os.getpid()}
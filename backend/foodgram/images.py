@@ -0,0 +1,153 @@
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from .tasks import enqueue, task
+
+VARIANTS = {
+    "thumbnail": 160,
+    "card": 480,
+    "full": 1280,
+}
+FORMATS = {
+    "webp": "WEBP",
+    "jpeg": "JPEG",
+}
+QUALITY = 82
+BACKGROUND_COLOR = (255, 255, 255)
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool():
+    """Getting lazily created per-process pool for rendering."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS)
+        return _render_pool
+
+
+def render_variants(data):
+    """
+    Rendering resized webp and jpeg variants of image.
+    Metadata is not copied, orientation is applied to pixels.
+    Runs in pool worker, so gets and returns plain bytes.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, BACKGROUND_COLOR)
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+    rendered = {}
+    for variant, size in VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        for extension, image_format in FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, quality=QUALITY)
+            rendered[variant, extension] = buffer.getvalue()
+    return rendered
+
+
+def get_variants_dir(name):
+    """Getting directory for variants of image with given name."""
+    directory, file_name = os.path.split(name)
+    return os.path.join(directory, "variants",
+                        os.path.splitext(file_name)[0])
+
+
+def delete_variants(variants):
+    """Releasing variants files."""
+    for formats in variants.values():
+        if isinstance(formats, dict):
+            for path in formats.values():
+                default_storage.delete(path)
+
+
+def release_image(name, variants):
+    """Releasing image and its variants files."""
+    if name:
+        default_storage.delete(name)
+    delete_variants(variants)
+
+
+def get_image_row(model, pk, field, name):
+    """Getting row of instance whose image is still name."""
+    lookup = Q(**{field: name})
+    if not name:
+        lookup |= Q(**{f"{field}__isnull": True})
+    return model.objects.filter(lookup, pk=pk)
+
+
+@task
+def process_image(model_label, pk, field, name):
+    """
+    Saving variants of image and storing their paths on instance.
+    Task of replaced image or deleted instance is done at once,
+    task of the new image handles it. Released are variants stored
+    on row at update.
+    """
+    model = apps.get_model(model_label)
+    if not get_image_row(model, pk, field, name).exists():
+        return
+    variants = {}
+    if name:
+        with default_storage.open(name, "rb") as image_file:
+            data = image_file.read()
+        if settings.IMAGE_PROCESS_POOL:
+            rendered = get_render_pool().submit(
+                render_variants, data).result()
+        else:
+            rendered = render_variants(data)
+        directory = get_variants_dir(name)
+        variants["source"] = name
+        for (variant, extension), content in rendered.items():
+            variants.setdefault(variant, {})[extension] = (
+                default_storage.save(
+                    os.path.join(directory, f"{variant}.{extension}"),
+                    ContentFile(content)))
+    with transaction.atomic():
+        current = get_image_row(model, pk, field, name).select_for_update(
+        ).values_list(f"{field}_variants", flat=True).first()
+        if current is None:
+            transaction.on_commit(lambda: delete_variants(variants))
+            return
+        model.objects.filter(pk=pk).update(
+            **{f"{field}_variants": variants})
+        transaction.on_commit(lambda: delete_variants(current))
+
+
+def schedule_image_variants(instance, field):
+    """Queueing variants processing in current transaction."""
+    name = getattr(instance, field).name or ""
+    variants = getattr(instance, f"{field}_variants")
+    if variants.get("source", "") == name:
+        return
+    enqueue(process_image, instance._meta.label, instance.pk, field, name)
+
+
+def get_variant_url(image, variant):
+    """Getting url of ready image variant or None."""
+    variants = getattr(image.instance, f"{image.field.name}_variants", {})
+    if variant is None or variants.get("source") != image.name:
+        return None
+    path = variants.get(variant, {}).get(settings.IMAGE_VARIANT_FORMAT)
+    if path is None:
+        return None
+    return default_storage.url(path)
@@ -1,39 +1,190 @@
+import csv
+import io
 import json
-import os
+import time
+from itertools import islice
 
-import psycopg2
 from django.conf import settings
 from django.core.management import BaseCommand
+from django.db import connection, transaction
+
+JSON_CHUNK_SIZE = 65536
+PROGRESS_STEP = 10000
+
+
+def iter_json_array(json_file):
+    """Streaming items of json array without loading whole file."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    while True:
+        chunk = json_file.read(JSON_CHUNK_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != "[":
+                    raise ValueError("Json file must contain array.")
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            yield item
+            position = end
+        if not chunk:
+            return
+
+
+class CsvStream:
+    """File-like object encoding rows as csv for COPY FROM STDIN."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.buffer = b""
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            line = io.StringIO()
+            csv.writer(line).writerow(row)
+            self.buffer += line.getvalue().encode("utf-8")
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
 
 
 class BaseImport(BaseCommand):
+    """
+    Base command for idempotent import of data files.
+    Rows are streamed with COPY FROM STDIN on PostgreSQL
+    and with batched bulk_create on other databases,
+    conflicts on conflict_fields are skipped or update update_fields.
+    """
+
+    model = None
+    fields = ()
+    conflict_fields = ()
+    update_fields = ()
+    file_name = None
+    message = None
+    data_version = None
+    batch_size = 1000
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            default=self.file_name,
+            help="Имя csv или json файла в директории data.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=self.batch_size,
+            help="Размер пачки для bulk_create.")
+
+    def handle(self, *args, **options):
+        self.processed = 0
+        self.started_at = time.monotonic()
+        path = settings.BASE_DIR / "data" / options["file"]
+        with open(path, "r", encoding="utf-8", newline="") as data_file:
+            rows = self.count_rows(self.read_rows(data_file, path.suffix))
+            with transaction.atomic():
+                if connection.vendor == "postgresql":
+                    self.copy_rows(rows)
+                else:
+                    self.bulk_create_rows(rows, options["batch_size"])
+        if self.data_version is not None:
+            self.data_version.bump()
+        elapsed = time.monotonic() - self.started_at
+        self.stdout.write(self.style.SUCCESS(
+            f"{self.message} Обработано строк: {self.processed} "
+            f"за {elapsed:.2f} с ({self.processed / max(elapsed, 1e-6):.0f} "
+            f"строк/с)."))
+
+    def read_rows(self, data_file, suffix):
+        """Yielding rows as tuples of fields values."""
+        if suffix == ".csv":
+            for row in csv.reader(data_file):
+                yield tuple(row[:len(self.fields)])
+        else:
+            for item in iter_json_array(data_file):
+                yield tuple(item[field] for field in self.fields)
+
+    def count_rows(self, rows):
+        for row in rows:
+            self.processed += 1
+            if self.processed % PROGRESS_STEP == 0:
+                elapsed = time.monotonic() - self.started_at
+                self.stdout.write(
+                    f"Обработано строк: {self.processed} "
+                    f"({self.processed / max(elapsed, 1e-6):.0f} строк/с)")
+            yield row
+
+    def get_conflict_sql(self, quote):
+        target = ", ".join(quote(field) for field in self.conflict_fields)
+        if not self.update_fields:
+            return f"ON CONFLICT ({target}) DO NOTHING"
+        updates = ", ".join(
+            f"{quote(field)} = EXCLUDED.{quote(field)}"
+            for field in self.update_fields)
+        return f"ON CONFLICT ({target}) DO UPDATE SET {updates}"
+
+    def copy_rows(self, rows):
+        """Loading rows into temp table by COPY and upserting them."""
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        temp_table = quote(f"import_{self.model._meta.db_table}")
+        columns = ", ".join(quote(field) for field in self.fields)
+        definitions = ", ".join(
+            f"{quote(field)} "
+            f"{self.model._meta.get_field(field).db_type(connection)}"
+            for field in self.fields)
+        distinct = ", ".join(quote(field) for field in self.conflict_fields)
+        # Empty fields stay empty strings, as in bulk_create path.
+        copy_sql = (f"COPY {temp_table} ({columns}) FROM STDIN "
+                    f"WITH (FORMAT csv, FORCE_NOT_NULL ({columns}))")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE {temp_table} ({definitions}) "
+                "ON COMMIT DROP")
+            stream = CsvStream(rows)
+            if hasattr(cursor.cursor, "copy_expert"):
+                cursor.cursor.copy_expert(copy_sql, stream)
+            else:
+                with cursor.cursor.copy(copy_sql) as copy:
+                    while data := stream.read(JSON_CHUNK_SIZE):
+                        copy.write(data)
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) "
+                f"SELECT DISTINCT ON ({distinct}) {columns} "
+                f"FROM {temp_table} "
+                f"{self.get_conflict_sql(quote)}")
 
-    def __init__(self, message, command, json_f, *args, **kwargs):
-        super().__init__()
-        message = message
-        command = command
-        json_f = json_f
-
-    def handle(self, *args, **kwargs):
-
-        conn = psycopg2.connect(
-            dbname=os.getenv("POSTGRES_DB", "django"),
-            host=os.getenv("DB_HOST", ""),
-            user=os.getenv("POSTGRES_USER", "django"),
-            password=os.getenv("POSTGRES_PASSWORD", ""),
-            port=os.getenv("DB_PORT", 5432))
-        with open(f"{settings.BASE_DIR}/data/{self.json_f}", "r",
-                  encoding="utf-8") as json_file:
-            data = json.load(json_file)
-        self.import_generic(conn, data)
-        self.stdout.write(
-            self.style.SUCCESS(self.message))
-
-    def import_generic(self, conn, data):
-
-        cursor = conn.cursor()
-        for item in data:
-            cursor.execute(self.command, tuple(item.values()))
-        conn.commit()
-        cursor.close()
-        conn.close()
+    def bulk_create_rows(self, rows, batch_size):
+        """Loading rows by batched bulk_create."""
+        options = {"ignore_conflicts": True}
+        if self.update_fields:
+            options = {
+                "update_conflicts": True,
+                "update_fields": self.update_fields,
+                "unique_fields": self.conflict_fields,
+            }
+        while batch := list(islice(rows, batch_size)):
+            unique = {}
+            for row in batch:
+                key = tuple(row[self.fields.index(field)]
+                            for field in self.conflict_fields)
+                unique[key] = self.model(**dict(zip(self.fields, row)))
+            self.model.objects.bulk_create(unique.values(), **options)
@@ -0,0 +1,101 @@
+import http.client
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management import BaseCommand, CommandError
+
+
+def get_connection(url):
+    parts = urlsplit(url)
+    if parts.scheme == "https":
+        return http.client.HTTPSConnection(parts.netloc)
+    return http.client.HTTPConnection(parts.netloc)
+
+
+def run_client(url, path, requests, headers):
+    """Sending requests over keep-alive connection, returning latencies."""
+    connection = get_connection(url)
+    latencies, errors = [], 0
+    for _ in range(requests):
+        started = time.perf_counter()
+        try:
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = get_connection(url)
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+        if response.status >= 400:
+            errors += 1
+    connection.close()
+    return latencies, errors
+
+
+def percentile(latencies, percent):
+    return latencies[min(len(latencies) - 1,
+                         int(len(latencies) * percent / 100))]
+
+
+class Command(BaseCommand):
+    """
+    For comparing read throughput of deployments,
+    e.g. WSGI and ASGI servers of the same database.
+    """
+
+    help = "Сравнение пропускной способности чтения по нескольким адресам."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "urls",
+            nargs="+",
+            help="Адреса серверов, например http://127.0.0.1:8000.")
+        parser.add_argument(
+            "--path",
+            default="/api/recipes/",
+            help="Запрашиваемый путь.")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=50,
+            help="Число одновременных клиентов.")
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=20,
+            help="Число запросов каждого клиента.")
+        parser.add_argument(
+            "--token",
+            help="Токен пользователя для авторизованных запросов.")
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options["token"]:
+            headers["Authorization"] = f"Token {options['token']}"
+        for url in options["urls"]:
+            if urlsplit(url).scheme not in ("http", "https"):
+                raise CommandError(f"Неверный адрес {url}.")
+            started = time.perf_counter()
+            with ThreadPoolExecutor(options["concurrency"]) as executor:
+                results = list(executor.map(
+                    lambda _: run_client(url, options["path"],
+                                         options["requests"], headers),
+                    range(options["concurrency"])))
+            elapsed = time.perf_counter() - started
+            latencies = sorted(
+                latency for client, _ in results for latency in client)
+            errors = sum(client_errors for _, client_errors in results)
+            if not latencies:
+                self.stdout.write(f"{url}: нет ответов, ошибок {errors}")
+                continue
+            self.stdout.write(
+                f"{url}: {len(latencies) / elapsed:.1f} запросов/с, "
+                f"ошибок {errors}, "
+                f"среднее {statistics.mean(latencies) * 1000:.1f} мс, "
+                f"p50 {percentile(latencies, 50) * 1000:.1f} мс, "
+                f"p95 {percentile(latencies, 95) * 1000:.1f} мс, "
+                f"p99 {percentile(latencies, 99) * 1000:.1f} мс")
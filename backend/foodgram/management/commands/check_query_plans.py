@@ -0,0 +1,86 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.views import CustomUserViewSet, RecipeViewSet
+from foodgram.models import Tag
+
+User = get_user_model()
+
+FULL_SCANS = {
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "sqlite": re.compile(r"SCAN (?:TABLE )?(\w+)(?! USING)(?:\s|$)"),
+}
+FEED_SIZE = 10
+
+
+def get_view(viewset, action, user=None, **params):
+    """Getting DRF view of action with GET request of user."""
+    request = APIRequestFactory().get("/", params)
+    if user is not None:
+        force_authenticate(request, user)
+    view = viewset(action_map={"get": action}, args=(), kwargs={},
+                   format_kwarg=None, headers={})
+    view.request = view.initialize_request(request)
+    return view
+
+
+def get_hot_queries(user, tag):
+    """
+    Getting querysets of feed, tag filter, favorites and subscriptions
+    as API views build them for requests of user.
+    """
+
+    def get_recipes(user=None, **params):
+        view = get_view(RecipeViewSet, "list", user, **params)
+        return view.get_queryset()[:FEED_SIZE]
+
+    subscriptions = get_view(CustomUserViewSet, "subscriptions", user)
+    return {
+        "feed": get_recipes(),
+        "author feed": get_recipes(author=user.pk),
+        "tag filter": get_recipes(tags=tag.slug),
+        "favorites": get_recipes(user, is_favorited=1),
+        "cart": get_recipes(user, is_in_shopping_cart=1),
+        "subscriptions": subscriptions.get_subscriptions()[:FEED_SIZE],
+    }
+
+
+class Command(BaseCommand):
+    """
+    For checking query plans of hot queries built by API views
+    for the first user and tag.
+    Fails when some of them reads any table by full scan,
+    sequential scans are disabled on PostgreSQL for the check.
+    """
+
+    help = "Проверка планов запросов ленты, тегов, избранного и подписок."
+
+    def handle(self, *args, **options):
+        full_scan = FULL_SCANS.get(connection.vendor)
+        if full_scan is None:
+            raise CommandError(
+                f"Планы запросов для {connection.vendor} не проверяются.")
+        user = User.objects.order_by("pk").first()
+        tag = Tag.objects.order_by("pk").first()
+        if user is None or tag is None:
+            raise CommandError("Для проверки нужны пользователь и тег.")
+        failed = []
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+            for name, queryset in get_hot_queries(user, tag).items():
+                plan = queryset.explain()
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"{name}:\n{plan}\n")
+                scanned = set(full_scan.findall(plan))
+                if scanned:
+                    failed.append(f"{name}: {', '.join(sorted(scanned))}")
+        if failed:
+            raise CommandError(
+                "Полное чтение таблиц в запросах: " + "; ".join(failed))
+        self.stdout.write(self.style.SUCCESS("Планы запросов в порядке."))
@@ -1,18 +1,16 @@
-from .base_import import BaseImport
+from api.versions import ingredients_version
+from foodgram.models import Ingredient
 
-MESSAGE = "Данные ингредиентов загружены."
-COMMAND = "INSERT INTO foodgram_ingredient \
-        (name, measurement_unit) VALUES (%s, %s)"
-FILE = "ingredients.json"
+from .base_import import BaseImport
 
 
 class Command(BaseImport):
     """For importing ingredients data into database."""
 
-    def __init__(self, message=MESSAGE,
-                 command=COMMAND,
-                 json_f=FILE, *args, **kwargs):
-        super().__init__(self, message, command, json_f)
-        self.message = message
-        self.command = command
-        self.json_f = json_f
+    help = "Загрузка ингредиентов из data/ingredients.csv."
+    model = Ingredient
+    fields = ("name", "measurement_unit")
+    conflict_fields = ("name", "measurement_unit")
+    file_name = "ingredients.csv"
+    message = "Данные ингредиентов загружены."
+    data_version = ingredients_version
@@ -1,17 +1,17 @@
-from .base_import import BaseImport
+from api.versions import tags_version
+from foodgram.models import Tag
 
-MESSAGE = "Данные тегов загружены."
-COMMAND = "INSERT INTO foodgram_tag (name, slug) VALUES (%s, %s)"
-FILE = "tags.json"
+from .base_import import BaseImport
 
 
 class Command(BaseImport):
     """For importing tags data into database."""
 
-    def __init__(self, message=MESSAGE,
-                 command=COMMAND,
-                 json_f=FILE, *args, **kwargs):
-        super().__init__(self, message, command, json_f)
-        self.message = message
-        self.command = command
-        self.json_f = json_f
+    help = "Загрузка тегов из data/tags.json."
+    model = Tag
+    fields = ("name", "slug")
+    conflict_fields = ("slug",)
+    update_fields = ("name",)
+    file_name = "tags.json"
+    message = "Данные тегов загружены."
+    data_version = tags_version
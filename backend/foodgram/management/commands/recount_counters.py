@@ -0,0 +1,16 @@
+from django.apps import apps
+from django.core.management import BaseCommand
+
+from foodgram.counters import recount_counters
+
+
+class Command(BaseCommand):
+    """For recomputing denormalized counters."""
+
+    help = "Пересчёт счётчиков избранного, корзины, рецептов и подписчиков."
+
+    def handle(self, *args, **kwargs):
+        recipes, users = recount_counters(apps.get_model)
+        self.stdout.write(self.style.SUCCESS(
+            f"Счётчики пересчитаны: рецептов {recipes}, "
+            f"пользователей {users}."))
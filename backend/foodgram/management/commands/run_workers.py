@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import connections
+
+from foodgram.tasks import run_worker
+
+
+class Command(BaseCommand):
+    """Running background tasks workers."""
+
+    help = "Запуск обработчиков фоновых задач."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.TASK_WORKERS,
+            help="Число обработчиков.")
+        parser.add_argument(
+            "--pool",
+            choices=("thread", "process"),
+            default=settings.TASK_POOL,
+            help="Обработчики в потоках или процессах.")
+        parser.add_argument(
+            "--visibility-timeout",
+            type=int,
+            default=settings.TASK_VISIBILITY_TIMEOUT,
+            help="Секунды, на которые взятая задача скрыта от других.")
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.TASK_POLL_INTERVAL,
+            help="Секунды ожидания при пустой очереди.")
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выполнить доступные задачи и завершиться.")
+
+    def handle(self, *args, **options):
+        if options["pool"] == "process":
+            connections.close_all()
+            context = multiprocessing.get_context("fork")
+            stop, worker_class = context.Event(), context.Process
+        else:
+            stop, worker_class = threading.Event(), threading.Thread
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        workers = [
+            worker_class(
+                target=run_worker,
+                args=(f"{prefix}:{number}", stop,
+                      options["visibility_timeout"],
+                      options["poll_interval"], options["once"]))
+            for number in range(options["workers"])]
+
+        def shutdown(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        self.stdout.write(
+            f"Запущено обработчиков: {options['workers']} "
+            f"({options['pool']}).")
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.stdout.write(self.style.SUCCESS("Обработчики остановлены."))
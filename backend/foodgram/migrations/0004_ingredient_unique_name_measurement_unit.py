@@ -0,0 +1,38 @@
+# Generated by Django 4.2.16 on 2026-10-18 02:53
+
+from django.db import migrations, models
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Repointing amounts to the first of duplicate ingredients."""
+    Ingredient = apps.get_model('foodgram', 'Ingredient')
+    IngredientAmount = apps.get_model('foodgram', 'IngredientAmount')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit').annotate(
+            first_id=models.Min('id'),
+            total=models.Count('id')).filter(total__gt=1)
+    for duplicate in duplicates:
+        extra_ids = Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit']).exclude(
+                id=duplicate['first_id']).values_list('id', flat=True)
+        IngredientAmount.objects.filter(
+            ingredient_id__in=list(extra_ids)).update(
+                ingredient_id=duplicate['first_id'])
+        Ingredient.objects.filter(id__in=list(extra_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0003_recipe_ordering_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_name_measurement_unit'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.16 on 2026-10-18 02:54
+
+from django.db import migrations, models
+
+
+def merge_duplicate_amounts(apps, schema_editor):
+    """Repointing recipes to the first of duplicate ingredient amounts."""
+    IngredientAmount = apps.get_model('foodgram', 'IngredientAmount')
+    RecipeIngredient = apps.get_model('foodgram', 'RecipeIngredient')
+    duplicates = IngredientAmount.objects.values(
+        'ingredient', 'amount').annotate(
+            first_id=models.Min('id'),
+            total=models.Count('id')).filter(total__gt=1)
+    for duplicate in duplicates:
+        extra_ids = IngredientAmount.objects.filter(
+            ingredient=duplicate['ingredient'],
+            amount=duplicate['amount']).exclude(
+                id=duplicate['first_id']).values_list('id', flat=True)
+        RecipeIngredient.objects.filter(
+            ingredient_id__in=list(extra_ids)).update(
+                ingredient_id=duplicate['first_id'])
+        IngredientAmount.objects.filter(id__in=list(extra_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0004_ingredient_unique_name_measurement_unit'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_amounts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredientamount',
+            constraint=models.UniqueConstraint(fields=('ingredient', 'amount'), name='unique_ingredient_amount'),
+        ),
+    ]
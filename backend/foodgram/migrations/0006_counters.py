@@ -0,0 +1,57 @@
+# Generated by Django 4.2.16 on 2026-10-18 02:56
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, field):
+    """Subquery counting model rows related to outer row by field."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=models.Count('pk')).values('total')), 0)
+
+
+def recount_counters(apps, db_alias):
+    """Recomputing denormalized counters from relation tables."""
+    Recipe = apps.get_model('foodgram', 'Recipe')
+    FavoriteRecipe = apps.get_model('foodgram', 'FavoriteRecipe')
+    IncartRecipe = apps.get_model('foodgram', 'IncartRecipe')
+    Subscription = apps.get_model('foodgram', 'Subscription')
+    User = apps.get_model('users', 'CustomUser')
+    Recipe.objects.using(db_alias).update(
+        favorites_count=count_subquery(FavoriteRecipe, 'item'),
+        incart_count=count_subquery(IncartRecipe, 'item'))
+    User.objects.using(db_alias).update(
+        recipes_count=count_subquery(Recipe, 'author'),
+        followers_count=count_subquery(Subscription, 'item'))
+
+
+def fill_counters(apps, schema_editor):
+    recount_counters(apps, schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0005_ingredientamount_unique'),
+        ('users', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='incart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число добавлений в корзину'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count'], name='recipe_favorites_count_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
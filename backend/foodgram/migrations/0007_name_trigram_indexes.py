@@ -0,0 +1,38 @@
+from django.db import migrations
+
+TRIGRAM_INDEXES = (
+    ('ingredient_name_upper_trgm', 'foodgram_ingredient', 'name'),
+    ('recipe_name_upper_trgm', 'foodgram_recipe', 'name'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    Creating GIN trigram indexes for admin icontains search.
+    Expression matches UPPER(name::text) LIKE UPPER(%s) of PostgreSQL.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0006_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 4.2.16 on 2026-10-18 03:04
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, field):
+    """Subquery counting model rows related to outer row by field."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=models.Count('pk')).values('total')), 0)
+
+
+def recount_counters(apps, db_alias):
+    """Recomputing denormalized counters from relation tables."""
+    Recipe = apps.get_model('foodgram', 'Recipe')
+    FavoriteRecipe = apps.get_model('foodgram', 'FavoriteRecipe')
+    IncartRecipe = apps.get_model('foodgram', 'IncartRecipe')
+    Subscription = apps.get_model('foodgram', 'Subscription')
+    User = apps.get_model('users', 'CustomUser')
+    Recipe.objects.using(db_alias).update(
+        favorites_count=count_subquery(FavoriteRecipe, 'item'),
+        incart_count=count_subquery(IncartRecipe, 'item'))
+    User.objects.using(db_alias).update(
+        recipes_count=count_subquery(Recipe, 'author'),
+        followers_count=count_subquery(Subscription, 'item'))
+
+
+RELATIONS = (
+    ('FavoriteRecipe', ('user', 'item')),
+    ('IncartRecipe', ('user', 'item')),
+    ('Subscription', ('user', 'item')),
+    ('RecipeTag', ('recipe', 'tag')),
+    ('RecipeIngredient', ('recipe', 'ingredient')),
+)
+
+
+def delete_duplicate_relations(apps, schema_editor):
+    """Keeping the first of duplicate relation rows."""
+    db_alias = schema_editor.connection.alias
+    for model_name, fields in RELATIONS:
+        model = apps.get_model('foodgram', model_name)
+        duplicates = model.objects.using(db_alias).values(*fields).annotate(
+            first_id=models.Min('id'),
+            total=models.Count('id')).filter(total__gt=1)
+        for duplicate in duplicates:
+            model.objects.using(db_alias).filter(
+                **{field: duplicate[field] for field in fields}).exclude(
+                    id=duplicate['first_id']).delete()
+    recount_counters(apps, db_alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0010_task'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            delete_duplicate_relations, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-created_at', '-id'], name='recipe_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='recipe_author_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipetag',
+            index=models.Index(fields=['tag', 'recipe'], name='recipetag_tag_recipe_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='favoriterecipe',
+            constraint=models.UniqueConstraint(fields=('user', 'item'), name='unique_favorite_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='incartrecipe',
+            constraint=models.UniqueConstraint(fields=('user', 'item'), name='unique_incart_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipetag',
+            constraint=models.UniqueConstraint(fields=('recipe', 'tag'), name='unique_recipe_tag'),
+        ),
+        migrations.AddConstraint(
+            model_name='subscription',
+            constraint=models.UniqueConstraint(fields=('user', 'item'), name='unique_subscription'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('russian', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(text, '')), 'B')"
+)
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Creating full text search index of recipes.
+    PostgreSQL gets generated tsvector column with GIN index,
+    SQLite gets FTS5 table filled by signals.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE foodgram_recipe ADD COLUMN IF NOT EXISTS '
+            f'search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR}) '
+            'STORED')
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+            'ON foodgram_recipe USING gin (search_vector)')
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS foodgram_recipe_fts '
+            "USING fts5(name, text, tokenize='unicode61 remove_diacritics 2')")
+        schema_editor.execute(
+            'INSERT INTO foodgram_recipe_fts (rowid, name, text) '
+            'SELECT id, name, text FROM foodgram_recipe')
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE foodgram_recipe DROP COLUMN IF EXISTS search_vector')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS foodgram_recipe_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0011_relation_constraints_and_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
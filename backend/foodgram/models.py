@@ -2,6 +2,8 @@ from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.db import models
 
+from .counters import CountersMixin
+
 User = get_user_model()
 
 
@@ -36,6 +38,11 @@ class Ingredient(models.Model):
 
     class Meta:
         ordering = ("name",)
+        constraints = (
+            models.UniqueConstraint(
+                fields=("name", "measurement_unit"),
+                name="unique_ingredient_name_measurement_unit"),
+        )
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
 
@@ -59,6 +66,11 @@ class IngredientAmount(models.Model):
 
     class Meta:
         ordering = ("id",)
+        constraints = (
+            models.UniqueConstraint(
+                fields=("ingredient", "amount"),
+                name="unique_ingredient_amount"),
+        )
         verbose_name = "Количество ингредиента"
         verbose_name_plural = "Количество ингредиентов"
 
@@ -66,12 +78,18 @@ class IngredientAmount(models.Model):
         return f"{self.ingredient.name} {self.amount}"
 
 
-class Recipe(models.Model):
+class Recipe(CountersMixin, models.Model):
     """Class for recipes table."""
 
+    counter_fields = ("favorites_count", "incart_count")
+
     image = models.ImageField(
         "Картинка",
         upload_to="recipes/images/",)
+    image_variants = models.JSONField(
+        "Варианты картинки",
+        default=dict,
+        editable=False)
     name = models.CharField("Название",
                             max_length=256)
     text = models.TextField("Описание")
@@ -90,9 +108,25 @@ class Recipe(models.Model):
         on_delete=models.CASCADE,
         verbose_name="Автор рецепта",)
     created_at = models.DateTimeField(auto_now_add=True)
+    favorites_count = models.PositiveIntegerField(
+        "Число добавлений в избранное",
+        default=0,
+        editable=False)
+    incart_count = models.PositiveIntegerField(
+        "Число добавлений в корзину",
+        default=0,
+        editable=False)
 
     class Meta:
-        ordering = ("-created_at", )
+        ordering = ("-created_at", "-id")
+        indexes = (
+            models.Index(fields=("-favorites_count",),
+                         name="recipe_favorites_count_idx"),
+            models.Index(fields=("-created_at", "-id"),
+                         name="recipe_created_at_idx"),
+            models.Index(fields=("author", "-created_at", "-id"),
+                         name="recipe_author_created_at_idx"),
+        )
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
 
@@ -114,6 +148,14 @@ class RecipeTag(models.Model):
 
     class Meta:
         ordering = ("id",)
+        constraints = (
+            models.UniqueConstraint(fields=("recipe", "tag"),
+                                    name="unique_recipe_tag"),
+        )
+        indexes = (
+            models.Index(fields=("tag", "recipe"),
+                         name="recipetag_tag_recipe_idx"),
+        )
         verbose_name = "Тег"
         verbose_name_plural = "Теги"
 
@@ -136,6 +178,10 @@ class RecipeIngredient(models.Model):
 
     class Meta:
         ordering = ("id",)
+        constraints = (
+            models.UniqueConstraint(fields=("recipe", "ingredient"),
+                                    name="unique_recipe_ingredient"),
+        )
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
 
@@ -159,6 +205,10 @@ class FavoriteRecipe(models.Model):
 
     class Meta:
         ordering = ('id',)
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'item'),
+                                    name='unique_favorite_recipe'),
+        )
         verbose_name = "Избранное"
         verbose_name_plural = "Избранные"
 
@@ -180,6 +230,10 @@ class IncartRecipe(models.Model):
 
     class Meta:
         ordering = ('id',)
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'item'),
+                                    name='unique_incart_recipe'),
+        )
         verbose_name = "Корзина"
         verbose_name_plural = "Корзина"
 
@@ -200,8 +254,102 @@ class Subscription(models.Model):
 
     class Meta:
         ordering = ('id',)
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'item'),
+                                    name='unique_subscription'),
+        )
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
 
     def __str__(self):
         return self.user.username
+
+
+class StoredFile(models.Model):
+    """
+    Class for table with references
+    to content addressed media files.
+    """
+
+    name = models.CharField("Путь к файлу",
+                            max_length=255,
+                            unique=True)
+    references = models.PositiveIntegerField("Число ссылок",
+                                             default=0)
+
+    class Meta:
+        ordering = ("id",)
+        verbose_name = "Файл"
+        verbose_name_plural = "Файлы"
+
+    def __str__(self):
+        return self.name
+
+
+class ReferenceVersion(models.Model):
+    """
+    Class for versions of rarely changed reference data,
+    shared by all processes.
+    """
+
+    name = models.CharField("Данные",
+                            max_length=32,
+                            unique=True)
+    version = models.CharField("Версия",
+                               max_length=32)
+    modified_at = models.DateTimeField("Дата изменения")
+
+    class Meta:
+        ordering = ("name",)
+        verbose_name = "Версия справочника"
+        verbose_name_plural = "Версии справочников"
+
+    def __str__(self):
+        return self.name
+
+
+class Task(models.Model):
+    """Class for background tasks queue table."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUSES = (
+        (PENDING, "Ожидает"),
+        (RUNNING, "Выполняется"),
+        (FAILED, "Ошибка"),
+    )
+
+    name = models.CharField("Задача",
+                            max_length=255)
+    args = models.JSONField("Аргументы",
+                            default=list)
+    kwargs = models.JSONField("Именованные аргументы",
+                              default=dict)
+    status = models.CharField("Статус",
+                              max_length=16,
+                              choices=STATUSES,
+                              default=PENDING)
+    attempts = models.PositiveIntegerField("Попытки",
+                                           default=0)
+    max_attempts = models.PositiveIntegerField("Максимум попыток")
+    run_at = models.DateTimeField("Запуск после")
+    locked_by = models.CharField("Обработчик",
+                                 max_length=255,
+                                 blank=True)
+    last_error = models.TextField("Последняя ошибка",
+                                  blank=True)
+    created_at = models.DateTimeField("Дата создания",
+                                      auto_now_add=True)
+
+    class Meta:
+        ordering = ("run_at", "id")
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = (
+            models.Index(fields=("status", "run_at"),
+                         name="task_status_run_at_idx"),
+        )
+
+    def __str__(self):
+        return self.name
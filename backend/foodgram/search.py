@@ -0,0 +1,70 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Recipe
+
+SEARCH_CONFIG = "russian"
+FTS_TABLE = "foodgram_recipe_fts"
+
+
+def get_search_words(query):
+    """Getting words of query without fts syntax characters."""
+    return re.findall(r"\w+", query.lower())
+
+
+def search_recipes(queryset, query):
+    """
+    Filtering recipes matching query and annotating search_rank.
+    PostgreSQL uses generated search_vector column with russian stemming,
+    SQLite uses FTS5 table with prefix matching of query words.
+    """
+    vendor = connections[queryset.db].vendor
+    table = Recipe._meta.db_table
+    if vendor == "postgresql":
+        vector = f'"{table}"."search_vector"'
+        tsquery = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        return queryset.annotate(
+            search_matched=RawSQL(f"{vector} @@ {tsquery}", (query,),
+                                  output_field=BooleanField()),
+            search_rank=RawSQL(f"ts_rank({vector}, {tsquery})", (query,),
+                               output_field=FloatField()),
+        ).filter(search_matched=True)
+    if vendor == "sqlite":
+        words = get_search_words(query)
+        if not words:
+            return queryset.annotate(search_rank=Value(0.0)).none()
+        match = " ".join(f'"{word}"*' for word in words)
+        return queryset.annotate(search_rank=RawSQL(
+            f"SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} "
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+            (match,), output_field=FloatField()),
+        ).filter(search_rank__isnull=False)
+    return queryset.annotate(search_rank=Value(0.0)).filter(
+        Q(name__icontains=query) | Q(text__icontains=query))
+
+
+def update_search_index(recipe, using):
+    """Writing recipe to FTS5 table, PostgreSQL column is generated."""
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                       (recipe.pk,))
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, text) "
+            "VALUES (%s, %s, %s)",
+            (recipe.pk, recipe.name, recipe.text))
+
+
+def delete_search_index(recipe, using):
+    """Removing recipe from FTS5 table."""
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+                       (recipe.pk,))
@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .images import release_image, schedule_image_variants
+from .models import FavoriteRecipe, IncartRecipe, Recipe, Subscription
+from .search import delete_search_index, update_search_index
+
+User = get_user_model()
+
+COUNTERS = (
+    (FavoriteRecipe, Recipe, "item_id", "favorites_count"),
+    (IncartRecipe, Recipe, "item_id", "incart_count"),
+    (Subscription, User, "item_id", "followers_count"),
+    (Recipe, User, "author_id", "recipes_count"),
+)
+IMAGE_FIELDS = (
+    (Recipe, "image"),
+    (User, "avatar"),
+)
+SEARCH_FIELDS = {"name", "text"}
+
+
+def change_counter(model, pk, field, delta):
+    """Changing counter by atomic UPDATE, never below zero."""
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)})
+
+
+def connect_counter(sender, model, foreign_key, field):
+    """Connecting counter to sender rows creation and deletion."""
+
+    def increment(instance, created, **kwargs):
+        if created:
+            change_counter(model, getattr(instance, foreign_key), field, 1)
+
+    def decrement(instance, **kwargs):
+        change_counter(model, getattr(instance, foreign_key), field, -1)
+
+    post_save.connect(increment, sender=sender, weak=False,
+                      dispatch_uid=f"{field}_increment")
+    post_delete.connect(decrement, sender=sender, weak=False,
+                        dispatch_uid=f"{field}_decrement")
+
+
+for counter in COUNTERS:
+    connect_counter(*counter)
+
+
+def connect_image_field(sender, field):
+    """
+    Connecting variants processing to sender image changes
+    and releasing replaced and deleted images.
+    """
+    loaded = f"_loaded_{field}"
+    uploaded = f"_uploaded_{field}"
+
+    def remember(instance, **kwargs):
+        value = instance.__dict__.get(field)
+        instance.__dict__[loaded] = getattr(value, "name", value) or ""
+
+    def mark_upload(instance, **kwargs):
+        instance.__dict__[uploaded] = not getattr(instance, field)._committed
+
+    def process(instance, update_fields=None, **kwargs):
+        if update_fields is not None and field not in update_fields:
+            return
+        old_name = instance.__dict__.get(loaded, "")
+        new_name = getattr(instance, field).name or ""
+        replaced = (old_name != new_name
+                    or instance.__dict__.pop(uploaded, False))
+        if old_name and replaced:
+            transaction.on_commit(lambda: default_storage.delete(old_name))
+        instance.__dict__[loaded] = new_name
+        schedule_image_variants(instance, field)
+
+    def release(instance, **kwargs):
+        name = getattr(instance, field).name
+        variants = getattr(instance, f"{field}_variants")
+        transaction.on_commit(lambda: release_image(name, variants))
+
+    post_init.connect(remember, sender=sender, weak=False,
+                      dispatch_uid=f"{field}_remember")
+    pre_save.connect(mark_upload, sender=sender, weak=False,
+                     dispatch_uid=f"{field}_upload")
+    post_save.connect(process, sender=sender, weak=False,
+                      dispatch_uid=f"{field}_variants")
+    post_delete.connect(release, sender=sender, weak=False,
+                        dispatch_uid=f"{field}_release")
+
+
+for image_field in IMAGE_FIELDS:
+    connect_image_field(*image_field)
+
+
+@receiver(post_save, sender=Recipe, dispatch_uid="recipe_search_update")
+def recipe_search_update(instance, using, update_fields=None, **kwargs):
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        update_search_index(instance, using)
+
+
+@receiver(post_delete, sender=Recipe, dispatch_uid="recipe_search_delete")
+def recipe_search_delete(instance, using, **kwargs):
+    delete_search_index(instance, using)
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+HASH_CHUNK_SIZE = 65536
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Media storage naming files by sha256 of their content.
+    Files are sharded into subdirectories, identical uploads are
+    stored once and reference counted in StoredFile table.
+    """
+
+    def get_content_name(self, name, content):
+        """Getting content addressed name in directory of given name."""
+        digest = hashlib.sha256()
+        if hasattr(content, "seek"):
+            content.seek(0)
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        if hasattr(content, "seek"):
+            content.seek(0)
+        content_hash = digest.hexdigest()
+        shards = [content_hash[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH]
+                  for level in range(SHARD_LEVELS)]
+        directory, file_name = os.path.split(name)
+        extension = os.path.splitext(file_name)[1].lower()
+        return os.path.join(directory, *shards, content_hash + extension)
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        """
+        Saving file once and adding reference to it.
+        Reference row is locked while file is checked, so concurrent
+        delete can not remove file being referenced, and file lost
+        from disk is written again.
+        """
+        from .models import StoredFile
+
+        name = self.get_content_name(name, content)
+        full_path = self.path(name)
+        with transaction.atomic():
+            stored, _ = StoredFile.objects.select_for_update().get_or_create(
+                name=name)
+            if not os.path.exists(full_path):
+                self.write_file(full_path, content)
+            stored.references += 1
+            stored.save(update_fields=("references",))
+        return name
+
+    def write_file(self, full_path, content):
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(descriptor, "wb") as temp_file:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    temp_file.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def delete(self, name):
+        """
+        Releasing one reference to file.
+        File is removed with its last reference under row lock,
+        files saved before reference counting are removed at once.
+        """
+        from .models import StoredFile
+
+        if not name:
+            return
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(
+                name=name).first()
+            if stored is not None and stored.references > 1:
+                stored.references -= 1
+                stored.save(update_fields=("references",))
+                return
+            if stored is not None:
+                stored.delete()
+            super().delete(name)
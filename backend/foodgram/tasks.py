@@ -0,0 +1,128 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (DatabaseError, close_old_connections, connections,
+                       transaction)
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def task(func):
+    """Registering function as background task."""
+    func.task_name = f"{func.__module__}.{func.__qualname__}"
+    return func
+
+
+def get_task(name):
+    """Getting registered task function by its name."""
+    func = import_string(name)
+    if getattr(func, "task_name", None) != name:
+        raise ValueError(f"{name} is not registered as task.")
+    return func
+
+
+def enqueue(func, *args, **kwargs):
+    """
+    Adding task to queue and returning at once.
+    Task row is written in current transaction,
+    so workers see it only after commit.
+    Arguments must be json serializable.
+    """
+    return Task.objects.create(
+        name=func.task_name,
+        args=list(args),
+        kwargs=kwargs,
+        max_attempts=settings.TASK_MAX_ATTEMPTS,
+        run_at=timezone.now())
+
+
+def claim_task(worker_id, visibility_timeout):
+    """
+    Taking next available task.
+    Claimed task is hidden for visibility_timeout seconds,
+    then it is available again if worker did not finish it.
+    """
+    now = timezone.now()
+    Task.objects.filter(
+        status=Task.RUNNING,
+        run_at__lte=now,
+        attempts__gte=F("max_attempts"),
+    ).update(status=Task.FAILED, last_error="Visibility timeout expired.")
+    while True:
+        with transaction.atomic():
+            claimed = (
+                Task.objects.select_for_update(skip_locked=True)
+                .filter(status__in=(Task.PENDING, Task.RUNNING),
+                        run_at__lte=now,
+                        attempts__lt=F("max_attempts"))
+                .first())
+            if claimed is None:
+                return None
+            updated = Task.objects.filter(
+                pk=claimed.pk, attempts=claimed.attempts,
+            ).update(
+                status=Task.RUNNING,
+                attempts=claimed.attempts + 1,
+                run_at=now + timedelta(seconds=visibility_timeout),
+                locked_by=worker_id)
+        if updated:
+            break
+    claimed.status = Task.RUNNING
+    claimed.attempts += 1
+    claimed.locked_by = worker_id
+    return claimed
+
+
+def run_task(claimed):
+    """
+    Running claimed task.
+    Finished task is removed from queue, failed one is retried
+    with exponential delay until attempts are exhausted.
+    """
+    own = Task.objects.filter(pk=claimed.pk,
+                              attempts=claimed.attempts,
+                              locked_by=claimed.locked_by)
+    try:
+        get_task(claimed.name)(*claimed.args, **claimed.kwargs)
+    except Exception:
+        logger.exception("Task %s (%s) failed.", claimed.pk, claimed.name)
+        if claimed.attempts >= claimed.max_attempts:
+            own.update(status=Task.FAILED,
+                       last_error=traceback.format_exc())
+        else:
+            delay = settings.TASK_RETRY_DELAY * 2 ** (claimed.attempts - 1)
+            own.update(status=Task.PENDING,
+                       run_at=timezone.now() + timedelta(seconds=delay),
+                       last_error=traceback.format_exc())
+    else:
+        own.delete()
+
+
+def run_worker(worker_id, stop, visibility_timeout, poll_interval,
+               once=False):
+    """
+    Claiming and running tasks until stop event is set.
+    With once worker exits when queue has no available tasks.
+    """
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                claimed = claim_task(worker_id, visibility_timeout)
+                if claimed is not None:
+                    run_task(claimed)
+                    continue
+            except DatabaseError:
+                logger.exception("Worker %s lost database.", worker_id)
+            if once:
+                break
+            stop.wait(poll_interval)
+    finally:
+        connections.close_all()
@@ -0,0 +1,319 @@
+import io
+import os
+import shutil
+import tempfile
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from .db import base
+from .db.pool import pools
+from .images import process_image
+from .models import (FavoriteRecipe, Ingredient, Recipe, RecipeTag, StoredFile,
+                     Subscription, Tag, Task)
+from .tasks import claim_task, enqueue, run_task, task
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@task
+def failing_task():
+    raise RuntimeError("Task failed.")
+
+
+@task
+def passing_task():
+    pass
+
+
+def get_png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def save_image(color):
+    return default_storage.save(
+        "recipes/images/image.png", ContentFile(get_png(color)))
+
+
+def get_paths(variants):
+    return [path for formats in variants.values()
+            if isinstance(formats, dict) for path in formats.values()]
+
+
+class MediaTestCase(TestCase):
+    """Base case with temporary media directory."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTest(MediaTestCase):
+    """Files are kept while referenced."""
+
+    def test_file_is_removed_with_last_reference(self):
+        name, same = save_image("red"), save_image("red")
+        self.assertEqual(name, same)
+        self.assertEqual(StoredFile.objects.get(name=name).references, 2)
+        default_storage.delete(name)
+        self.assertTrue(default_storage.exists(name))
+        default_storage.delete(name)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+    def test_lost_file_is_written_again(self):
+        name = save_image("red")
+        os.remove(default_storage.path(name))
+        save_image("red")
+        with default_storage.open(name, "rb") as image_file:
+            self.assertEqual(image_file.read(), get_png("red"))
+        self.assertEqual(StoredFile.objects.get(name=name).references, 2)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PROCESS_POOL=False)
+class ProcessImageTest(MediaTestCase):
+    """Variants tasks survive replaced images and duplicates."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass")
+
+    def create_recipe(self, image):
+        return Recipe.objects.create(
+            author=self.author, name="Рецепт", text="Текст",
+            cooking_time=10, image=image)
+
+    def run_task(self, recipe, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            process_image(Recipe._meta.label, recipe.pk, "image", name)
+        recipe.refresh_from_db()
+
+    def test_task_of_replaced_image_is_done(self):
+        recipe = self.create_recipe(save_image("red"))
+        self.run_task(recipe, "recipes/images/removed.png")
+        self.assertEqual(recipe.image_variants, {})
+
+    def test_duplicate_tasks_release_old_variants_once(self):
+        name = save_image("red")
+        recipe, other = self.create_recipe(name), self.create_recipe(name)
+        self.run_task(recipe, name)
+        self.run_task(other, name)
+        old_variants = recipe.image_variants
+        recipe.image = save_image("blue")
+        recipe.save()
+        for _ in range(2):
+            self.run_task(recipe, recipe.image.name)
+        self.assertEqual(recipe.image_variants["source"], recipe.image.name)
+        # Small image gives equal files, they are referenced per variant.
+        for path, count in Counter(get_paths(old_variants)).items():
+            self.assertTrue(default_storage.exists(path))
+            self.assertEqual(
+                StoredFile.objects.get(name=path).references, count)
+
+
+class QueryPlansTest(TestCase):
+    """Hot queries of API views read tables by indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(
+            username="user", email="user@example.com", password="pass")
+        author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass")
+        tag = Tag.objects.create(name="Тег", slug="tag")
+        recipe = Recipe.objects.create(
+            author=author, name="Рецепт", text="Текст", cooking_time=10,
+            image="recipes/images/image.png")
+        RecipeTag.objects.create(recipe=recipe, tag=tag)
+        Subscription.objects.create(user=user, item=author)
+
+    def test_hot_queries_do_not_scan_tables(self):
+        stdout = io.StringIO()
+        call_command("check_query_plans", verbosity=2, stdout=stdout)
+        self.assertIn("subscriptions:", stdout.getvalue())
+
+
+class FakeConnection:
+    """Driver connection failing queries when broken."""
+
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+
+    def get_transaction_status(self):
+        return TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        if self.broken:
+            raise base.DatabaseWrapper.Database.OperationalError("closed")
+        return mock.MagicMock()
+
+    def close(self):
+        self.closed = 1
+
+
+class PooledConnectionTest(SimpleTestCase):
+    """Broken connections of pool are not given out."""
+
+    def setUp(self):
+        self.connection = base.DatabaseWrapper(
+            {"NAME": "foodgram", "OPTIONS": {}, "CONN_HEALTH_CHECKS": True},
+            alias="pooled")
+        patcher = mock.patch.object(
+            base.base.DatabaseWrapper, "get_new_connection",
+            side_effect=lambda params: FakeConnection())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(pools.pop, "pooled", None)
+
+    def reuse(self, driver_connection):
+        self.connection.connection = driver_connection
+        self.connection._close()
+        self.connection.connection = None
+        return self.connection.get_new_connection({})
+
+    def test_alive_connection_is_reused(self):
+        first = self.connection.get_new_connection({})
+        self.assertIs(self.reuse(first), first)
+
+    def test_broken_connection_is_replaced(self):
+        first = self.connection.get_new_connection({})
+        first.broken = True
+        second = self.reuse(first)
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pools["pooled"].get_stats()["size"], 1)
+
+
+class ImportTest(TestCase):
+    """Imports are idempotent."""
+
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(
+                "w", suffix=".csv", encoding="utf-8", delete=False) as file:
+            file.write("соль,г\nсахар,г\nсоль,г\nвода,\n")
+        self.addCleanup(os.remove, file.name)
+        self.path = file.name
+
+    def test_second_import_adds_nothing(self):
+        for _ in range(2):
+            call_command("import_ingredients", file=self.path,
+                         stdout=io.StringIO())
+            self.assertEqual(Ingredient.objects.count(), 3)
+        self.assertTrue(Ingredient.objects.filter(
+            name="вода", measurement_unit="").exists())
+
+
+class CountersTest(TestCase):
+    """Saving instances loaded before keeps counters."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass")
+        self.recipe = Recipe.objects.create(
+            author=self.author, name="Рецепт", text="Текст",
+            cooking_time=10, image="recipes/images/image.png")
+
+    def test_user_save_keeps_counters(self):
+        author = User.objects.get(pk=self.author.pk)
+        Recipe.objects.create(
+            author=self.author, name="Рецепт", text="Текст",
+            cooking_time=10, image="recipes/images/image.png")
+        author.first_name = "Имя"
+        author.save()
+        author.refresh_from_db()
+        self.assertEqual(author.recipes_count, 2)
+        self.assertEqual(author.first_name, "Имя")
+
+    def test_recipe_save_keeps_counters(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        FavoriteRecipe.objects.create(user=self.author, item=self.recipe)
+        recipe.name = "Новое название"
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(recipe.name, "Новое название")
+
+
+@override_settings(TASK_MAX_ATTEMPTS=3, TASK_RETRY_DELAY=10)
+class TaskQueueTest(TestCase):
+    """Tasks are retried with backoff and reclaimed after timeout."""
+
+    def claim(self, worker_id="worker", visibility_timeout=60):
+        return claim_task(worker_id, visibility_timeout)
+
+    def expire(self, claimed):
+        Task.objects.filter(pk=claimed.pk).update(
+            run_at=timezone.now() - timedelta(seconds=1))
+
+    def assertRunAt(self, claimed, seconds):
+        run_at = Task.objects.get(pk=claimed.pk).run_at
+        self.assertAlmostEqual(
+            (run_at - timezone.now()).total_seconds(), seconds, delta=2)
+
+    def test_finished_task_is_removed(self):
+        enqueue(passing_task)
+        claimed = self.claim()
+        self.assertEqual((claimed.status, claimed.attempts, claimed.locked_by),
+                         (Task.RUNNING, 1, "worker"))
+        run_task(claimed)
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_task_is_retried_with_backoff(self):
+        enqueue(failing_task)
+        for attempt, delay in ((1, 10), (2, 20)):
+            claimed = self.claim()
+            with self.assertLogs("foodgram.tasks", "ERROR"):
+                run_task(claimed)
+            stored = Task.objects.get(pk=claimed.pk)
+            self.assertEqual((stored.status, stored.attempts),
+                             (Task.PENDING, attempt))
+            self.assertIn("RuntimeError", stored.last_error)
+            self.assertRunAt(claimed, delay)
+            self.assertIsNone(self.claim())
+            self.expire(claimed)
+        claimed = self.claim()
+        with self.assertLogs("foodgram.tasks", "ERROR"):
+            run_task(claimed)
+        stored = Task.objects.get(pk=claimed.pk)
+        self.assertEqual((stored.status, stored.attempts), (Task.FAILED, 3))
+        self.expire(claimed)
+        self.assertIsNone(self.claim())
+
+    def test_expired_lease_is_reclaimed(self):
+        enqueue(passing_task)
+        stale = self.claim("first")
+        self.assertRunAt(stale, 60)
+        self.assertIsNone(self.claim("second"))
+        self.expire(stale)
+        claimed = self.claim("second")
+        self.assertEqual((claimed.pk, claimed.attempts, claimed.locked_by),
+                         (stale.pk, 2, "second"))
+        run_task(stale)
+        self.assertTrue(Task.objects.filter(pk=stale.pk).exists())
+        run_task(claimed)
+        self.assertFalse(Task.objects.exists())
+
+    def test_lease_of_last_attempt_expires_as_failure(self):
+        Task.objects.filter(pk=enqueue(passing_task).pk).update(attempts=2)
+        claimed = self.claim()
+        self.expire(claimed)
+        self.assertIsNone(self.claim())
+        stored = Task.objects.get(pk=claimed.pk)
+        self.assertEqual(stored.status, Task.FAILED)
+        self.assertEqual(stored.last_error, "Visibility timeout expired.")
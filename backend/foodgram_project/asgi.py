@@ -3,5 +3,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram_project.settings")
+os.environ.setdefault("ROOT_URLCONF", "foodgram_project.asgi_urls")
+# Sync code of requests runs in new threads, persistent connections
+# would be left open by them, DB_POOL reuses connections instead.
+os.environ.setdefault("DB_CONN_MAX_AGE", "0")
 
 application = get_asgi_application()
@@ -0,0 +1,137 @@
+"""
+Gunicorn config of foodgram_project project.
+
+Used as ``gunicorn -c python:foodgram_project.gunicorn_conf``,
+all values may be overridden by GUNICORN_* environment variables.
+"""
+
+import math
+import os
+import threading
+
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def read_file(path):
+    with open(path) as file:
+        return file.read().strip()
+
+
+def get_cpu_quota():
+    """Getting CPUs limit of cgroup CFS quota, None when it is not set."""
+    try:
+        quota, period = read_file(CGROUP_CPU_MAX).split()
+    except FileNotFoundError:
+        try:
+            quota = read_file(CGROUP_V1_CPU_QUOTA)
+            period = read_file(CGROUP_V1_CPU_PERIOD)
+        except OSError:
+            return None
+    except (OSError, ValueError):
+        return None
+    try:
+        quota, period = int(quota), int(period)
+    except ValueError:
+        return None
+    if quota <= 0 or period <= 0:
+        return None
+    return max(1, math.ceil(quota / period))
+
+
+def get_cpu_count():
+    """
+    Getting number of CPUs available to process:
+    CPUs of affinity mask limited by cgroup CPU quota of container.
+    """
+    try:
+        cpu_count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpu_count = os.cpu_count() or 1
+    quota = get_cpu_quota()
+    if quota is None:
+        return cpu_count
+    return min(cpu_count, quota)
+
+
+cpu_count = get_cpu_count()
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8080")
+workers = int(os.getenv("GUNICORN_WORKERS", cpu_count * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 2))
+worker_class = os.getenv(
+    "GUNICORN_WORKER_CLASS", "gthread" if threads > 1 else "sync")
+
+preload_app = "false" != os.getenv("GUNICORN_PRELOAD", "true").lower()
+
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv(
+    "GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10))
+
+# Nginx buffers request bodies, so timeout covers decoding
+# and saving of base64 images, not slow uploads.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def warm_up_connection():
+    from django.db import connection
+
+    connection.ensure_connection()
+
+
+def when_ready(server):
+    """Closing connections of preloaded application before forking."""
+    if preload_app:
+        from django.db import connections
+
+        connections.close_all()
+
+
+def post_worker_init(worker):
+    """
+    Warming up caches and database connections of worker,
+    so first requests after deploy do not build them.
+    Runs after application is loaded, when preload is off too.
+    Connections of gthread workers are opened in pool threads,
+    they are kept between requests when CONN_MAX_AGE is set.
+    """
+    from django.db import DatabaseError, connections
+
+    from api.ingredient_index import ingredient_index
+    from api.versions import ingredients_version, tags_version
+
+    try:
+        tags_version.get()
+        ingredients_version.get()
+        ingredient_index.get_state()
+        pool = getattr(worker, "tpool", None)
+        if pool is None:
+            warm_up_connection()
+            return
+        connections.close_all()
+        barrier = threading.Barrier(worker.cfg.threads)
+
+        def warm_up_thread():
+            try:
+                warm_up_connection()
+                barrier.wait(worker.cfg.timeout)
+            except threading.BrokenBarrierError:
+                return
+            except Exception as error:
+                barrier.abort()
+                worker.log.warning("Warm-up of thread failed: %s", error)
+
+        for _ in range(worker.cfg.threads):
+            pool.submit(warm_up_thread)
+    except DatabaseError as error:
+        worker.log.warning("Warm-up failed: %s", error)
@@ -36,7 +36,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'foodgram_project.urls'
+ROOT_URLCONF = os.getenv('ROOT_URLCONF', 'foodgram_project.urls')
 
 TEMPLATES = [
     {
@@ -56,14 +56,37 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram_project.wsgi.application'
 
+# Pool of connections per worker process instead of persistent
+# connection per thread, closed connections go back to pool.
+DB_POOL = 'true' == os.getenv('DB_POOL', '').lower()
+
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', os.getenv('GUNICORN_THREADS', 2)))
+
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+
+DB_POOL_MAX_LIFETIME = int(os.getenv('DB_POOL_MAX_LIFETIME', 3600))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'foodgram.db' if DB_POOL else 'django.db.backends.postgresql'),
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv(
+            'DB_CONN_MAX_AGE', 0 if DB_POOL else 60)),
+        'CONN_HEALTH_CHECKS': 'false' != os.getenv(
+            'DB_CONN_HEALTH_CHECKS', 'true').lower(),
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
@@ -100,11 +123,69 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = BASE_DIR / '/media/'
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'foodgram.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 AUTH_USER_MODEL = 'users.CustomUser'
 
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', 300))
+
+REFERENCE_VERSION_TTL = int(os.getenv('REFERENCE_VERSION_TTL', 5))
+
+REFERENCE_DATA_MAX_AGE = int(os.getenv('REFERENCE_DATA_MAX_AGE', 60))
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 30))
+
+TOKEN_CACHE_BACKEND = os.getenv('TOKEN_CACHE_BACKEND') or None
+
+THROTTLE_CACHE_SIZE = int(os.getenv('THROTTLE_CACHE_SIZE', 100000))
+
+THROTTLE_CACHE_BACKEND = os.getenv('THROTTLE_CACHE_BACKEND') or None
+
+SHORT_LINK_CACHE_SIZE = int(os.getenv('SHORT_LINK_CACHE_SIZE', 10000))
+
+SHORT_LINK_MAX_AGE = int(os.getenv('SHORT_LINK_MAX_AGE', 86400))
+
+TASK_WORKERS = int(os.getenv('TASK_WORKERS', 2))
+
+TASK_POOL = os.getenv('TASK_POOL', 'thread')
+
+TASK_VISIBILITY_TIMEOUT = int(os.getenv('TASK_VISIBILITY_TIMEOUT', 300))
+
+TASK_POLL_INTERVAL = float(os.getenv('TASK_POLL_INTERVAL', 1))
+
+TASK_MAX_ATTEMPTS = int(os.getenv('TASK_MAX_ATTEMPTS', 5))
+
+TASK_RETRY_DELAY = int(os.getenv('TASK_RETRY_DELAY', 10))
+
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
+IMAGE_PROCESS_POOL = 'true' == os.getenv('IMAGE_PROCESS_POOL', '').lower()
+
+IMAGE_VARIANT_FORMAT = os.getenv('IMAGE_VARIANT_FORMAT', 'webp')
+
+SHOPPING_LIST_FONT = os.getenv(
+    'SHOPPING_LIST_FONT', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication'
+        'api.authentication.CachedTokenAuthentication'
     ],
     "DEFAULT_PERMISSION_CLASSES": [
-        "rest_framework.permissions.AllowAny"], }
+        "rest_framework.permissions.AllowAny"],
+    "DEFAULT_THROTTLE_RATES": {
+        "auth": os.getenv("THROTTLE_AUTH_RATE", "30/min"),
+        "recipe_write": os.getenv("THROTTLE_RECIPE_WRITE_RATE", "60/min"),
+        "toggle": os.getenv("THROTTLE_TOGGLE_RATE", "120/min"),
+        "download": os.getenv("THROTTLE_DOWNLOAD_RATE", "10/min"),
+    },
+    # Nginx appends client address to X-Forwarded-For.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", 1)), }
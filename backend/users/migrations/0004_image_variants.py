@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 02:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='avatar_variants',
+            field=models.JSONField(default=dict, editable=False, verbose_name='Варианты аватара'),
+        ),
+    ]
@@ -1,15 +1,31 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from foodgram.counters import CountersMixin
 
-class CustomUser(AbstractUser):
+
+class CustomUser(CountersMixin, AbstractUser):
     """CustomUser class."""
 
+    counter_fields = ("recipes_count", "followers_count")
+
     email = models.EmailField(max_length=254,
                               unique=True)
     avatar = models.ImageField(
         null=True,
         upload_to="users/")
+    avatar_variants = models.JSONField(
+        "Варианты аватара",
+        default=dict,
+        editable=False)
+    recipes_count = models.PositiveIntegerField(
+        "Число рецептов",
+        default=0,
+        editable=False)
+    followers_count = models.PositiveIntegerField(
+        "Число подписчиков",
+        default=0,
+        editable=False)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username", "first_name", "last_name", "password"]